@@ -1,10 +1,34 @@
 import os
+import threading
+from contextlib import contextmanager
 from neurons.setup_logger import setup_logger
 from neo4j import GraphDatabase
 
 
 logger = setup_logger("GraphIndexer")
 
+# rows are sent as positional lists rather than maps so no keys are packed per row
+# transactions: [tx_id, timestamp, block_height, is_coinbase]
+_Q_UPSERT_TX = """
+    UNWIND $transactions AS tx
+    MERGE (t:Transaction {tx_id: tx[0]})
+    ON CREATE SET t.timestamp = tx[1],
+                  t.block_height = tx[2],
+                  t.is_coinbase = tx[3]
+"""
+
+_Q_MERGE_ADDRESSES = """
+    UNWIND $addresses AS address
+    MERGE (a:Address {address: address})
+"""
+
+# vouts: [tx_id, address, value_satoshi, is_coinbase]
+_Q_CREATE_VOUTS = """
+    UNWIND $vouts AS vout
+    MATCH (t:Transaction {tx_id: vout[0]}), (a:Address {address: vout[1]})
+    CREATE (t)-[:SENT { value_satoshi: vout[2], is_coinbase: vout[3] }]->(a)
+"""
+
 
 class GraphIndexer:
     def __init__(
@@ -17,12 +41,32 @@ class GraphIndexer:
             url,
             auth=(user, password),
         )
+        self._thread_local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
 
     def close(self):
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+        self._thread_local = threading.local()
         self.driver.close()
 
+    @contextmanager
+    def session(self):
+        # the driver hands out a fresh session per call; keep one per thread so its
+        # pooled connection is reused from block to block instead of re-acquired
+        session = getattr(self._thread_local, "session", None)
+        if session is None:
+            session = self.driver.session()
+            self._thread_local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        yield session
+
     def get_latest_block_number(self):
-        with self.driver.session() as session:
+        with self.session() as session:
             result = session.run(
                 """
                 MATCH (t:Transaction)
@@ -35,23 +79,10 @@ class GraphIndexer:
 
             return single_result[0]
 
-    from decimal import getcontext
-
-    # Set the precision high enough to handle satoshis for Bitcoin transactions
-    getcontext().prec = 28
-
     def create_indexes(self):
-        with self.driver.session() as session:
-            # Fetch existing indexes
-            existing_indexes = session.run("SHOW INDEX INFO")
-            existing_index_set = set()
-            for record in existing_indexes:
-                label = record["label"]
-                property = record["property"]
-                index_name = f"{label}-{property}"
-                if index_name:
-                    existing_index_set.add(index_name)
-
+        with self.session() as session:
+            # memgraph has no IF NOT EXISTS, but re-creating an existing index or constraint
+            # only returns a notification, so the statements are run as-is every startup
             index_creation_statements = {
                 "Transaction-tx_id": "CREATE INDEX ON :Transaction(tx_id);",
                 "Transaction-block_height": "CREATE INDEX ON :Transaction(block_height);",
@@ -60,78 +91,79 @@ class GraphIndexer:
             }
 
             for index_name, statement in index_creation_statements.items():
-                if index_name not in existing_index_set:
-                    try:
-                        logger.info(f"Creating index: {index_name}")
-                        session.run(statement)
-                    except Exception as e:
-                        logger.error(f"An exception occurred while creating index {index_name}: {e}")
-
-    def create_graph_focused_on_money_flow(self, in_memory_graph, batch_size=8):
+                try:
+                    logger.info(f"Creating index: {index_name}")
+                    session.run(statement).consume()
+                except Exception as e:
+                    logger.error(f"An exception occurred while creating index {index_name}: {e}")
+
+            # unique constraints make concurrent MERGEs on the key lock by index entry
+            constraint_creation_statements = {
+                "Transaction-tx_id": "CREATE CONSTRAINT ON (t:Transaction) ASSERT t.tx_id IS UNIQUE;",
+                "Address-address": "CREATE CONSTRAINT ON (a:Address) ASSERT a.address IS UNIQUE;",
+            }
+
+            for constraint_name, statement in constraint_creation_statements.items():
+                try:
+                    logger.info(f"Creating constraint: {constraint_name}")
+                    session.run(statement).consume()
+                except Exception as e:
+                    logger.error(f"An exception occurred while creating constraint {constraint_name}: {e}")
+
+    def create_graph_focused_on_money_flow(self, in_memory_graph, batch_size=10000):
         block_node = in_memory_graph["block"]
         transactions = block_node.transactions
 
-        with self.driver.session() as session:
-            # Start a transaction
-            transaction = session.begin_transaction()
+        # Flatten the whole block up front so it is sent as whole-block UNWINDs
+        # instead of a pair of round-trips per handful of transactions
+        batch_transactions = [
+            (tx.tx_id, tx.timestamp, tx.block_height, tx.is_coinbase)
+            for tx in transactions
+        ]
+
+        batch_vouts = []
+        for tx in transactions:
+            vouts = tx.vouts
+            # only the first vout of a coinbase transaction is flagged, so it is peeled off the loop
+            if tx.is_coinbase and vouts:
+                batch_vouts.append((tx.tx_id, vouts[0].address, vouts[0].value_satoshi, True))
+                vouts = vouts[1:]
+
+            batch_vouts.extend(
+                (tx.tx_id, vout.address, vout.value_satoshi, False) for vout in vouts
+            )
+
+        batch_addresses = list({vout[1] for vout in batch_vouts})
 
+        with self.session() as session:
             try:
-                for i in range(0, len(transactions), batch_size):
-                    batch_transactions = transactions[i : i + batch_size]
-
-                    # Process transactions in the current batch
-                    transaction.run(
-                        """
-                        UNWIND $transactions AS tx
-                        MERGE (t:Transaction {tx_id: tx.tx_id})
-                        ON CREATE SET t.timestamp = tx.timestamp,
-                                      t.block_height = tx.block_height,
-                                      t.is_coinbase = tx.is_coinbase
-                        """,
-                        transactions=[
-                            {
-                                "tx_id": tx.tx_id,
-                                "timestamp": tx.timestamp,
-                                "block_height": tx.block_height,
-                                "is_coinbase": tx.is_coinbase,
-                            }
-                            for tx in batch_transactions
-                        ],
-                    )
-
-                    # Process all vouts for transactions in the current batch
-                    batch_vouts = []
-                    for tx in batch_transactions:
-                        for index, vout in enumerate(tx.vouts):
-                            batch_vouts.append(
-                                {
-                                    "tx_id": tx.tx_id,
-                                    "address": vout.address,
-                                    "value_satoshi": vout.value_satoshi,
-                                    "is_coinbase": tx.is_coinbase
-                                    and index
-                                    == 0,  # True only for the first vout of a coinbase transaction
-                                }
-                            )
-
-                    transaction.run(
-                        """
-                        UNWIND $vouts AS vout
-                        MERGE (a:Address {address: vout.address})
-                        MERGE (t:Transaction {tx_id: vout.tx_id})
-                        CREATE (t)-[:SENT { value_satoshi: vout.value_satoshi, is_coinbase: vout.is_coinbase }]->(a)
-                        """,
-                        vouts=batch_vouts,
-                    )
-
-                transaction.commit()
+                session.execute_write(
+                    self._create_money_flow, batch_transactions, batch_addresses, batch_vouts, batch_size
+                )
                 return True
 
             except Exception as e:
-                transaction.rollback()
                 logger.error(f"An exception occurred: {e}")
                 return False
 
-            finally:
-                if transaction.closed() is False:
-                    transaction.close()
+    @staticmethod
+    def _create_money_flow(transaction, batch_transactions, batch_addresses, batch_vouts, batch_size):
+        # Only blocks above batch_size rows are split into more than one UNWIND
+        for i in range(0, len(batch_transactions), batch_size):
+            transaction.run(
+                _Q_UPSERT_TX,
+                transactions=batch_transactions[i : i + batch_size],
+            )
+
+        for i in range(0, len(batch_addresses), batch_size):
+            transaction.run(
+                _Q_MERGE_ADDRESSES,
+                addresses=batch_addresses[i : i + batch_size],
+            )
+
+        # both endpoints exist by now, so edges only need lock-free lookups
+        for i in range(0, len(batch_vouts), batch_size):
+            transaction.run(
+                _Q_CREATE_VOUTS,
+                vouts=batch_vouts[i : i + batch_size],
+            )
@@ -2,6 +2,7 @@ import os
 import signal
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from neurons.setup_logger import setup_logger
 from neurons.nodes.factory import NodeFactory
 from neurons.miners.bitcoin.funds_flow.graph_creator import GraphCreator
@@ -22,78 +23,98 @@ def shutdown_handler(signum, frame):
     shutdown_flag = True
 
 
+def prepare_block(_bitcoin_node, _graph_creator, block_height):
+    block = _bitcoin_node.get_block_by_height(block_height)
+    num_transactions = len(block["tx"])
+    in_memory_graph = _graph_creator.create_in_memory_graph_from_block(block)
+    return num_transactions, in_memory_graph
+
+
 def index_blocks(_bitcoin_node, _graph_creator, _graph_indexer, start_height):
     global shutdown_flag
     skip_blocks = 6
 
-    while not shutdown_flag:
-        current_block_height = _bitcoin_node.get_current_block_height() - 6
-        if current_block_height - skip_blocks < 0:
-            logger.info("Waiting min 6 for blocks to be mined.")
-            time.sleep(10)
-            continue
-
-        if start_height > current_block_height:
-            logger.info(
-                f"Waiting for new blocks. Current height is {current_block_height}."
-            )
-            time.sleep(10)
-            continue
-
-        block_height = start_height
-        while block_height <= current_block_height - skip_blocks:
-            block = _bitcoin_node.get_block_by_height(block_height)
-            num_transactions = len(block["tx"])
-            start_time = time.time()
-            in_memory_graph = _graph_creator.create_in_memory_graph_from_block(block)
-            success = _graph_indexer.create_graph_focused_on_money_flow(in_memory_graph)
-            end_time = time.time()
-            time_taken = end_time - start_time
-            node_block_height = bitcoin_node.get_current_block_height()
-            progress = block_height / node_block_height * 100
-            formatted_num_transactions = "{:>4}".format(num_transactions)
-            formatted_time_taken = "{:6.2f}".format(time_taken)
-            formatted_tps = "{:8.2f}".format(
-                num_transactions / time_taken if time_taken > 0 else float("inf")
-            )
-            formatted_progress = "{:6.2f}".format(progress)
-
-            if time_taken > 0:
+    # next block is fetched and built while the current one is being written to the graph
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while not shutdown_flag:
+            current_block_height = _bitcoin_node.get_current_block_height() - 6
+            if current_block_height - skip_blocks < 0:
+                logger.info("Waiting min 6 for blocks to be mined.")
+                time.sleep(10)
+                continue
+
+            if start_height > current_block_height:
                 logger.info(
-                    "Block {:>6}: Processed {} transactions in {} seconds {} TPS Progress: {}%".format(
-                        block_height,
-                        formatted_num_transactions,
-                        formatted_time_taken,
-                        formatted_tps,
-                        formatted_progress,
-                    )
+                    f"Waiting for new blocks. Current height is {current_block_height}."
                 )
-            else:
-                logger.info(
-                    "Block {:>6}: Processed {} transactions in 0.00 seconds (  Inf TPS). Progress: {}%".format(
-                        block_height, formatted_num_transactions, formatted_progress
-                    )
+                time.sleep(10)
+                continue
+
+            block_height = start_height
+            last_block_height = current_block_height - skip_blocks
+            prepared_block = None
+            next_block = None
+            while block_height <= last_block_height:
+                if prepared_block is None:
+                    if next_block is None:
+                        next_block = executor.submit(prepare_block, _bitcoin_node, _graph_creator, block_height)
+                    prepared_block = next_block.result()
+                    next_block = None
+                num_transactions, in_memory_graph = prepared_block
+
+                if next_block is None and block_height < last_block_height:
+                    next_block = executor.submit(prepare_block, _bitcoin_node, _graph_creator, block_height + 1)
+
+                start_time = time.time()
+                success = _graph_indexer.create_graph_focused_on_money_flow(in_memory_graph)
+                end_time = time.time()
+                time_taken = end_time - start_time
+                node_block_height = bitcoin_node.get_current_block_height()
+                progress = block_height / node_block_height * 100
+                formatted_num_transactions = "{:>4}".format(num_transactions)
+                formatted_time_taken = "{:6.2f}".format(time_taken)
+                formatted_tps = "{:8.2f}".format(
+                    num_transactions / time_taken if time_taken > 0 else float("inf")
                 )
+                formatted_progress = "{:6.2f}".format(progress)
+
+                if time_taken > 0:
+                    logger.info(
+                        "Block {:>6}: Processed {} transactions in {} seconds {} TPS Progress: {}%".format(
+                            block_height,
+                            formatted_num_transactions,
+                            formatted_time_taken,
+                            formatted_tps,
+                            formatted_progress,
+                        )
+                    )
+                else:
+                    logger.info(
+                        "Block {:>6}: Processed {} transactions in 0.00 seconds (  Inf TPS). Progress: {}%".format(
+                            block_height, formatted_num_transactions, formatted_progress
+                        )
+                    )
 
-            if success:
-                block_height += 1
+                if success:
+                    block_height += 1
+                    prepared_block = None
 
-                # indexer flooding prevention
-                threshold = int(os.getenv('BLOCK_PROCESSING_TRANSACTION_THRESHOLD', 500))
-                if num_transactions > threshold:
-                    delay = float(os.getenv('BLOCK_PROCESSING_DELAY', 1))
-                    logger.info(f"Block tx count above {threshold}, slowing down indexing by {delay} seconds to prevent flooding.")
-                    time.sleep(delay)
+                    # indexer flooding prevention
+                    threshold = int(os.getenv('BLOCK_PROCESSING_TRANSACTION_THRESHOLD', 500))
+                    if num_transactions > threshold:
+                        delay = float(os.getenv('BLOCK_PROCESSING_DELAY', 1))
+                        logger.info(f"Block tx count above {threshold}, slowing down indexing by {delay} seconds to prevent flooding.")
+                        time.sleep(delay)
 
-            else:
-                logger.error(f"Failed to index block {block_height}.")
-                time.sleep(30)
+                else:
+                    logger.error(f"Failed to index block {block_height}.")
+                    time.sleep(30)
 
-            if shutdown_flag:
-                logger.info(f"Finished indexing block {block_height} before shutdown.")
-                break
+                if shutdown_flag:
+                    logger.info(f"Finished indexing block {block_height} before shutdown.")
+                    break
 
-            start_height += 1
+                start_height += 1
 
 
 
@@ -34,6 +34,9 @@ class Transaction:
 
 @dataclass
 class VOUT:
+    # plain __slots__ as dataclass(slots=True) needs python 3.10; every block creates thousands of these
+    __slots__ = ("vout_id", "value_satoshi", "script_pub_key", "is_spent", "address")
+
     vout_id: int
     value_satoshi: int
     script_pub_key: Optional[str]
@@ -43,6 +46,8 @@ class VOUT:
 
 @dataclass
 class VIN:
+    __slots__ = ("tx_id", "vin_id", "vout_id", "script_sig", "sequence")
+
     tx_id: str
     vin_id: int
     vout_id: int
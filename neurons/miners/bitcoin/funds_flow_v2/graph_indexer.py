@@ -1,10 +1,75 @@
 import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+import numpy as np
 from neurons.setup_logger import setup_logger
 from neo4j import GraphDatabase
 
 
 logger = setup_logger("GraphIndexer")
 
+# rows are sent as positional lists rather than maps so no keys are packed per row
+# transactions: [tx_id, in_total_amount, out_total_amount, timestamp, block_height, is_coinbase]
+_Q_UPSERT_TX = """
+    UNWIND $transactions AS tx
+    MERGE (t:Transaction {tx_id: tx[0]})
+    ON CREATE SET t.in_total_amount = tx[1],
+                t.out_total_amount = tx[2],
+                t.timestamp = tx[3],
+                t.block_height = tx[4],
+                t.is_coinbase = tx[5]
+"""
+
+_Q_MERGE_ADDRESSES = """
+    UNWIND $addresses AS address
+    MERGE (a:Address {address: address})
+"""
+
+# inputs / outputs: [address, amount, tx_id]
+_Q_CREATE_INPUTS = """
+    UNWIND $inputs AS input
+    MATCH (a:Address {address: input[0]}), (t:Transaction {tx_id: input[2]})
+    CREATE (a)-[:SENT { value_satoshi: input[1] }]->(t)
+"""
+
+_Q_CREATE_OUTPUTS = """
+    UNWIND $outputs AS output
+    MATCH (t:Transaction {tx_id: output[2]}), (a:Address {address: output[0]})
+    CREATE (t)-[:SENT { value_satoshi: output[1] }]->(a)
+"""
+
+
+# below this many addresses the plain loop beats building the arrays
+NUMPY_NETTING_THRESHOLD = 256
+
+
+def net_amounts_by_address(in_amount_by_address, out_amount_by_address):
+    # net the amounts of addresses that appear on both sides, zero nets are dropped
+    addresses = list(in_amount_by_address.keys() | out_amount_by_address.keys())
+
+    if len(in_amount_by_address) + len(out_amount_by_address) <= NUMPY_NETTING_THRESHOLD:
+        net_in_amount_by_address = {}
+        net_out_amount_by_address = {}
+        for address in addresses:
+            net_amount = in_amount_by_address.get(address, 0) - out_amount_by_address.get(address, 0)
+            if net_amount > 0:
+                net_in_amount_by_address[address] = net_amount
+            elif net_amount < 0:
+                net_out_amount_by_address[address] = -net_amount
+        return net_in_amount_by_address, net_out_amount_by_address
+
+    in_amounts = np.fromiter((in_amount_by_address.get(address, 0) for address in addresses), dtype=np.int64, count=len(addresses))
+    out_amounts = np.fromiter((out_amount_by_address.get(address, 0) for address in addresses), dtype=np.int64, count=len(addresses))
+    net_amounts = in_amounts - out_amounts
+
+    # tolist() turns the values back into python ints, which is what the driver can pack
+    in_indices = np.flatnonzero(net_amounts > 0).tolist()
+    out_indices = np.flatnonzero(net_amounts < 0).tolist()
+    net_in_amount_by_address = dict(zip((addresses[i] for i in in_indices), net_amounts[in_indices].tolist()))
+    net_out_amount_by_address = dict(zip((addresses[i] for i in out_indices), (-net_amounts[out_indices]).tolist()))
+    return net_in_amount_by_address, net_out_amount_by_address
+
 
 class GraphIndexer:
     def __init__(
@@ -12,6 +77,7 @@ class GraphIndexer:
         graph_db_url: str = None,
         graph_db_user: str = None,
         graph_db_password: str = None,
+        max_connection_pool_size: int = None,
     ):
         if graph_db_url is None:
             self.graph_db_url = (
@@ -30,16 +96,42 @@ class GraphIndexer:
         else:
             self.graph_db_password = graph_db_password
 
+        if max_connection_pool_size is None:
+            self.max_connection_pool_size = int(os.environ.get("GRAPH_DB_POOL_SIZE") or 100)
+        else:
+            self.max_connection_pool_size = max_connection_pool_size
+
         self.driver = GraphDatabase.driver(
             self.graph_db_url,
             auth=(self.graph_db_user, self.graph_db_password),
+            max_connection_pool_size=self.max_connection_pool_size,
         )
+        self._thread_local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
 
     def close(self):
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+        self._thread_local = threading.local()
         self.driver.close()
 
+    @contextmanager
+    def session(self):
+        # the driver hands out a fresh session per call; keep one per thread so its
+        # pooled connection is reused from block to block instead of re-acquired
+        session = getattr(self._thread_local, "session", None)
+        if session is None:
+            session = self.driver.session()
+            self._thread_local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        yield session
+
     def get_latest_block_number(self):
-        with self.driver.session() as session:
+        with self.session() as session:
             result = session.run(
                 """
                 MATCH (t:Transaction)
@@ -53,7 +145,7 @@ class GraphIndexer:
             return single_result[0]
         
     def get_min_block_number(self):
-        with self.driver.session() as session:
+        with self.session() as session:
             result = session.run(
                 """
                 MATCH (t:Transaction)
@@ -66,23 +158,10 @@ class GraphIndexer:
 
             return single_result[0]
 
-    from decimal import getcontext
-
-    # Set the precision high enough to handle satoshis for Bitcoin transactions
-    getcontext().prec = 28
-
     def create_indexes(self):
-        with self.driver.session() as session:
-            # Fetch existing indexes
-            existing_indexes = session.run("SHOW INDEX INFO")
-            existing_index_set = set()
-            for record in existing_indexes:
-                label = record["label"]
-                property = record["property"]
-                index_name = f"{label}-{property}"
-                if index_name:
-                    existing_index_set.add(index_name)
-
+        with self.session() as session:
+            # memgraph has no IF NOT EXISTS, but re-creating an existing index or constraint
+            # only returns a notification, so the statements are run as-is every startup
             index_creation_statements = {
                 "Transaction-tx_id": "CREATE INDEX ON :Transaction(tx_id);",
                 "Transaction-block_height": "CREATE INDEX ON :Transaction(block_height);",
@@ -92,126 +171,101 @@ class GraphIndexer:
             }
 
             for index_name, statement in index_creation_statements.items():
-                if index_name not in existing_index_set:
-                    try:
-                        logger.info(f"Creating index: {index_name}")
-                        session.run(statement)
-                    except Exception as e:
-                        logger.error(f"An exception occurred while creating index {index_name}: {e}")
-
-    def create_graph_focused_on_money_flow(self, in_memory_graph, _bitcoin_node, batch_size=8):
+                try:
+                    logger.info(f"Creating index: {index_name}")
+                    session.run(statement).consume()
+                except Exception as e:
+                    logger.error(f"An exception occurred while creating index {index_name}: {e}")
+
+            # unique constraints make concurrent MERGEs on the key lock by index entry
+            constraint_creation_statements = {
+                "Transaction-tx_id": "CREATE CONSTRAINT ON (t:Transaction) ASSERT t.tx_id IS UNIQUE;",
+                "Address-address": "CREATE CONSTRAINT ON (a:Address) ASSERT a.address IS UNIQUE;",
+            }
+
+            for constraint_name, statement in constraint_creation_statements.items():
+                try:
+                    logger.info(f"Creating constraint: {constraint_name}")
+                    session.run(statement).consume()
+                except Exception as e:
+                    logger.error(f"An exception occurred while creating constraint {constraint_name}: {e}")
+
+    def create_graph_focused_on_money_flow(self, in_memory_graph, _bitcoin_node, batch_size=10000):
         block_node = in_memory_graph["block"]
         transactions = block_node.transactions
 
-        with self.driver.session() as session:
-            # Start a transaction
-            transaction = session.begin_transaction()
-
-            try:
-                for i in range(0, len(transactions), batch_size):
-                    batch_transactions = transactions[i : i + batch_size]
-
-                    # Process all transactions, inputs, and outputs in the current batch
-                    batch_txns = []
-                    batch_inputs = []
-                    batch_outputs = []
-                    for tx in batch_transactions:
-                        in_amount_by_address = {} # input amounts by address in satoshi
-                        out_amount_by_address = {} # output amounts by address in satoshi
-                        
-                        for vin in tx.vins:
-                            if vin.tx_id == 0:
-                                continue
-                            address, amount = _bitcoin_node.get_address_and_amount_by_txn_id_and_vout_id(vin.tx_id, str(vin.vout_id))
-                            if address in in_amount_by_address:
-                                in_amount_by_address[address] += amount
-                            else:
-                                in_amount_by_address[address] = amount
-
-                        for vout in tx.vouts:
-                            amount = vout.value_satoshi
-                            address = vout.address
-                            if vout.address in out_amount_by_address:
-                                out_amount_by_address[address] += amount
-                            else:
-                                out_amount_by_address[address] = amount
-                        
-                        for address in in_amount_by_address.keys():
-                            if in_amount_by_address[address] == 0:
-                                continue
-                            if address in out_amount_by_address and out_amount_by_address[address] != 0:
-                                if in_amount_by_address[address] > out_amount_by_address[address]:
-                                    in_amount_by_address[address] -= out_amount_by_address[address]
-                                    out_amount_by_address[address] = 0
-                                elif in_amount_by_address[address] < out_amount_by_address[address]:
-                                    out_amount_by_address[address] -= in_amount_by_address[address]
-                                    in_amount_by_address[address] = 0
-                                else:
-                                    in_amount_by_address[address] = 0
-                                    out_amount_by_address[address] = 0
-                        
-                        input_addresses = [address for address in in_amount_by_address.keys() if in_amount_by_address[address] != 0]
-                        output_addresses = [address for address in out_amount_by_address.keys() if out_amount_by_address[address] != 0]
-                                    
-                        in_total_amount = sum([in_amount_by_address[address] for address in input_addresses])
-                        out_total_amount = sum([out_amount_by_address[address] for address in output_addresses])
-                        
-                        inputs = [{"address": address, "amount": in_amount_by_address[address], "tx_id": tx.tx_id } for address in input_addresses]
-                        outputs = [{"address": address, "amount": out_amount_by_address[address], "tx_id": tx.tx_id } for address in output_addresses]
-
-                        batch_txns.append({
-                            "tx_id": tx.tx_id,
-                            "in_total_amount": in_total_amount,
-                            "out_total_amount": out_total_amount,
-                            "timestamp": tx.timestamp,
-                            "block_height": tx.block_height,
-                            "is_coinbase": tx.is_coinbase,
-                        })
-                        batch_inputs += inputs
-                        batch_outputs += outputs
-
-                    transaction.run(
-                        """
-                        UNWIND $transactions AS tx
-                        MERGE (t:Transaction {tx_id: tx.tx_id})
-                        ON CREATE SET t.timestamp = tx.timestamp,
-                                    t.in_total_amount = tx.in_total_amount,
-                                    t.out_total_amount = tx.out_total_amount,
-                                    t.timestamp = tx.timestamp,
-                                    t.block_height = tx.block_height,
-                                    t.is_coinbase = tx.is_coinbase
-                        """,
-                        transactions=batch_txns,
-                    )
-                    
-                    transaction.run(
-                        """
-                        UNWIND $inputs AS input
-                        MERGE (a:Address {address: input.address})
-                        MERGE (t:Transaction {tx_id: input.tx_id})
-                        CREATE (a)-[:SENT { value_satoshi: input.amount }]->(t)
-                        """,
-                        inputs=batch_inputs
-                    )
-                    
-                    transaction.run(
-                        """
-                        UNWIND $outputs AS output
-                        MERGE (a:Address {address: output.address})
-                        MERGE (t:Transaction {tx_id: output.tx_id})
-                        CREATE (t)-[:SENT { value_satoshi: output.amount }]->(a)
-                        """,
-                        outputs=batch_outputs
-                    )
-
-                transaction.commit()
-                return True
-
-            except Exception as e:
-                transaction.rollback()
-                logger.error(f"An exception occurred: {e}")
-                return False
-
-            finally:
-                if transaction.closed() is False:
-                    transaction.close()
+        try:
+            # Resolve the outputs spent by all inputs of the block in one go, a failed lookup
+            # returns False like a failed commit so the indexer retries the block
+            vin_outputs = _bitcoin_node.get_addresses_and_amounts_by_txn_ids_and_vout_ids(
+                [(vin.tx_id, str(vin.vout_id)) for tx in transactions for vin in tx.vins if vin.tx_id != 0]
+            )
+
+            # Process all transactions, inputs, and outputs of the block up front
+            batch_txns = []
+            batch_inputs = []
+            batch_outputs = []
+            for tx in transactions:
+                in_amount_by_address = defaultdict(int) # input amounts by address in satoshi
+                out_amount_by_address = defaultdict(int) # output amounts by address in satoshi
+
+                for vin in tx.vins:
+                    if vin.tx_id == 0:
+                        continue
+                    address, amount = vin_outputs[(vin.tx_id, str(vin.vout_id))]
+                    in_amount_by_address[address] += amount
+
+                for vout in tx.vouts:
+                    out_amount_by_address[vout.address] += vout.value_satoshi
+
+                net_in_amount_by_address, net_out_amount_by_address = net_amounts_by_address(
+                    in_amount_by_address, out_amount_by_address
+                )
+
+                in_total_amount = sum(net_in_amount_by_address.values())
+                out_total_amount = sum(net_out_amount_by_address.values())
+
+                tx_id = tx.tx_id
+                batch_txns.append((tx_id, in_total_amount, out_total_amount, tx.timestamp, tx.block_height, tx.is_coinbase))
+                batch_inputs.extend((address, amount, tx_id) for address, amount in net_in_amount_by_address.items())
+                batch_outputs.extend((address, amount, tx_id) for address, amount in net_out_amount_by_address.items())
+
+            batch_addresses = list({row[0] for rows in (batch_inputs, batch_outputs) for row in rows})
+
+            with self.session() as session:
+                session.execute_write(
+                    self._create_money_flow, batch_txns, batch_addresses, batch_inputs, batch_outputs, batch_size
+                )
+            return True
+
+        except Exception as e:
+            logger.error(f"An exception occurred: {e}")
+            return False
+
+    @staticmethod
+    def _create_money_flow(transaction, batch_txns, batch_addresses, batch_inputs, batch_outputs, batch_size):
+        # Only blocks above batch_size rows are split into more than one UNWIND
+        for i in range(0, len(batch_txns), batch_size):
+            transaction.run(
+                _Q_UPSERT_TX,
+                transactions=batch_txns[i : i + batch_size],
+            )
+
+        for i in range(0, len(batch_addresses), batch_size):
+            transaction.run(
+                _Q_MERGE_ADDRESSES,
+                addresses=batch_addresses[i : i + batch_size]
+            )
+
+        # both endpoints exist by now, so edges only need lock-free lookups
+        for i in range(0, len(batch_inputs), batch_size):
+            transaction.run(
+                _Q_CREATE_INPUTS,
+                inputs=batch_inputs[i : i + batch_size]
+            )
+
+        for i in range(0, len(batch_outputs), batch_size):
+            transaction.run(
+                _Q_CREATE_OUTPUTS,
+                outputs=batch_outputs[i : i + batch_size]
+            )
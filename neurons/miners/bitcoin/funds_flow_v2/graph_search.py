@@ -3,6 +3,17 @@ import typing
 
 from neo4j import GraphDatabase
 
+from template.utils.misc import ttl_cache
+
+# seconds discovery results are reused, every validator asks for them on every step
+DISCOVERY_CACHE_TTL = 60
+
+_Q_BLOCK_TRANSACTIONS = """
+    UNWIND $block_heights AS block_height
+    MATCH (t:Transaction { block_height: block_height })
+    RETURN block_height, COUNT(t) AS transaction_count
+"""
+
 
 class GraphSearch:
     def __init__(
@@ -38,32 +49,17 @@ class GraphSearch:
         return []
 
     def get_block_transaction(self, block_height):
-        with self.driver.session() as session:
-            data_set = session.run(
-                """
-                MATCH (t:Transaction { block_height: $block_height })
-                RETURN t.block_height AS block_height, COUNT(t) AS transaction_count
-                """,
-                block_height=block_height
-            )
-            result = data_set.single()
-            return {
-                "block_height": result["block_height"],
-                "transaction_count": result["transaction_count"]
-            }
+        return self.get_block_transactions([block_height])[0]
 
+    @ttl_cache(maxsize=1, ttl=DISCOVERY_CACHE_TTL)
     def get_run_id(self):
         records, summary, keys = self.driver.execute_query("RETURN 1")
         return summary.metadata.get('run_id', None)
 
     def get_block_transactions(self, block_heights: typing.List[int]):
+        # all heights are counted in one round trip, each served by the Transaction(block_height) index
         with self.driver.session() as session:
-            query = """
-                UNWIND $block_heights AS block_height
-                MATCH (t:Transaction { block_height: block_height })
-                RETURN block_height, COUNT(t) AS transaction_count
-            """
-            data_set = session.run(query, block_heights=block_heights)
+            data_set = session.run(_Q_BLOCK_TRANSACTIONS, block_heights=block_heights)
 
             results = []
             for record in data_set:
@@ -74,6 +70,7 @@ class GraphSearch:
 
             return results
 
+    @ttl_cache(maxsize=1, ttl=DISCOVERY_CACHE_TTL)
     def get_block_range(self):
         with self.driver.session() as session:
             result = session.run(
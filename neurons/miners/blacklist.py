@@ -71,16 +71,11 @@ def discovery_blacklist(self, synapse: protocol.Discovery) -> typing.Tuple[bool,
     if is_blacklist:
         return is_blacklist, message
     
-    axon_uid = None
-    for uid, _axon in enumerate(self.metagraph.axons):  # noqa: B007
-        if _axon.hotkey == hotkey:
-            axon_uid=uid
-            break
-    
+    axon_uid = self.hotkey_to_uid.get(hotkey)
     if axon_uid is None:
         return True, f"Blacklisted a non registered hotkey's request from {hotkey}"
     
-    stake = self.metagraph.neurons[uid].stake.tao
+    stake = self.metagraph.neurons[axon_uid].stake.tao
     bt.logging.debug(f"Stake of {hotkey}: {stake}")
 
     if stake < self.miner_config.stake_threshold and self.config.mode == 'prod':
@@ -124,7 +119,7 @@ def base_blacklist(self, synapse: bt.Synapse) -> typing.Tuple[bool, str]:
     """
 
     hotkey = synapse.dendrite.hotkey
-    if hotkey not in self.metagraph.hotkeys:
+    if hotkey not in self.hotkey_to_uid:
         bt.logging.trace(
             f"Blacklisting unrecognized hotkey {hotkey}"
         )
@@ -1,17 +1,38 @@
 import os
+import threading
+from contextlib import contextmanager
 from neo4j import GraphDatabase
-from decimal import Decimal
 
 from neurons.setup_logger import setup_logger
 
 logger = setup_logger("EthereumGraphIndexer")
 
+# rows are sent as positional lists rather than maps so no keys are packed per row
+# addresses: [timestamp, from_address, from_balance, to_address, to_balance]
+_Q_MERGE_ADDRESSES = """
+    UNWIND $transactions AS tx
+    MERGE (from:Address {address: tx[1]})
+    ON CREATE SET from.timestamp = tx[0],
+        from.balance = tx[2]
+    MERGE (to:Address {address: tx[3]})
+    ON CREATE SET to.timestamp = tx[0],
+        to.balance = tx[4]
+"""
+
+# transfers: [tx_hash, block_number, value, fee_wei, timestamp, symbol, from_address, to_address]
+_Q_CREATE_TRANSFERS = """
+    UNWIND $transactions AS tx
+    MATCH (from:Address {address: tx[6]}), (to:Address {address: tx[7]})
+    CREATE (from)-[:SENT { tx_hash: tx[0], block_number: tx[1], value: tx[2], fee: tx[3], timestamp: tx[4], symbol: tx[5] }]->(to)
+"""
+
 class GraphIndexer:
     def __init__(
         self,
         graph_db_url: str = None,
         graph_db_user: str = None,
         graph_db_password: str = None,
+        max_connection_pool_size: int = None,
     ):
         if graph_db_url is None:
             self.graph_db_url = (
@@ -30,17 +51,43 @@ class GraphIndexer:
         else:
             self.graph_db_password = graph_db_password
 
+        if max_connection_pool_size is None:
+            self.max_connection_pool_size = int(os.environ.get("GRAPH_DB_POOL_SIZE") or 100)
+        else:
+            self.max_connection_pool_size = max_connection_pool_size
+
         self.driver = GraphDatabase.driver(
             self.graph_db_url,
             auth=(self.graph_db_user, self.graph_db_password),
+            max_connection_pool_size=self.max_connection_pool_size,
         )
+        self._thread_local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
 
 
     def close(self):
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+        self._thread_local = threading.local()
         self.driver.close()
 
+    @contextmanager
+    def session(self):
+        # the driver hands out a fresh session per call; keep one per thread so its
+        # pooled connection is reused from block to block instead of re-acquired
+        session = getattr(self._thread_local, "session", None)
+        if session is None:
+            session = self.driver.session()
+            self._thread_local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        yield session
+
     def get_latest_block_number(self):
-        with self.driver.session() as session:
+        with self.session() as session:
             result = session.run(
                 """
                 MATCH ()-[r:SENT]->()
@@ -53,17 +100,9 @@ class GraphIndexer:
 
             return single_result[0]
     def create_indexes(self):
-        with self.driver.session() as session:
-            # Fetch existing indexes
-            existing_indexes = session.run("SHOW INDEX INFO")
-            existing_index_set = set()
-            for record in existing_indexes:
-                label = record["label"]
-                property = record["property"]
-                index_name = f"{label}-{property}"
-                if index_name:
-                    existing_index_set.add(index_name)
-
+        with self.session() as session:
+            # memgraph has no IF NOT EXISTS, but re-creating an existing index or constraint
+            # only returns a notification, so the statements are run as-is every startup
             index_creation_statements = {
                 "Address-balance": "CREATE INDEX ON :Address(balance);",
                 "Address-timestamp": "CREATE INDEX ON :Address(timestamp);",
@@ -73,74 +112,70 @@ class GraphIndexer:
             }
 
             for index_name, statement in index_creation_statements.items():
-                if index_name not in existing_index_set:
-                    try:
-                        logger.info(f"Creating index: {index_name}")
-                        session.run(statement)
-                    except Exception as e:
-                        logger.error(f"An exception occurred while creating index {index_name}: {e}")
-
-    def create_graph_focused_on_funds_flow(self, in_memory_graph, batch_size=8):
-        block_node = in_memory_graph["block"]
-        transactions = block_node.transactions
-        with self.driver.session() as session:
-            # start memgraph transaction
-            transaction = session.begin_transaction()
-            try:
-                for i in range(0, len(transactions), batch_size):
-                    batch_transactions = transactions[i : i + batch_size]
-                    
-                    transaction.run(
-                        """
-                        UNWIND $transactions AS tx
-                        MERGE (from:Address {address: tx.from_address})
-                        ON CREATE SET from.timestamp = tx.timestamp,
-                            from.balance = tx.from_balance
-                        MERGE (to:Address {address: tx.to_address})
-                        ON CREATE SET to.timestamp = tx.timestamp,
-                            to.balance = tx.to_balance
-                        """,
-                        transactions = [
-                            {
-                                "timestamp": tx.timestamp,
-                                "from_address": tx.from_address.address,
-                                "from_balance": str(tx.to_address.balance),
-                                "to_address": tx.to_address.address,
-                                "to_balance": str(tx.to_address.balance),
-                            }
-                            for tx in batch_transactions
-                        ],
-                    )
-                    transaction.run(
-                        """
-                        UNWIND $transactions AS tx
-                        MERGE (from:Address {address: tx.from_address})
-                        MERGE (to:Address {address: tx.to_address})
-                        CREATE (from)-[:SENT { tx_hash: tx.tx_hash, block_number:tx.block_number, value: tx.value, fee: tx.fee_wei, timestamp: tx.timestamp, symbol:tx.symbol }]->(to)
-                        """,
-                        transactions = [
-                            {
-                                "tx_hash": tx.tx_hash,
-                                "block_number": tx.block_number,
-                                "value": str(tx.value_wei),
-                                "fee_wei": str(tx.gas_used),
-                                "timestamp": tx.timestamp,
-                                "symbol": tx.symbol,
-                                "from_address": tx.from_address.address,
-                                "to_address": tx.to_address.address,
-                            }
-                            for tx in batch_transactions 
-                        ]
-                    )
+                try:
+                    logger.info(f"Creating index: {index_name}")
+                    session.run(statement).consume()
+                except Exception as e:
+                    logger.error(f"An exception occurred while creating index {index_name}: {e}")
+
+            # unique constraints make concurrent MERGEs on the key lock by index entry
+            constraint_creation_statements = {
+                "Address-address": "CREATE CONSTRAINT ON (a:Address) ASSERT a.address IS UNIQUE;",
+            }
+
+            for constraint_name, statement in constraint_creation_statements.items():
+                try:
+                    logger.info(f"Creating constraint: {constraint_name}")
+                    session.run(statement).consume()
+                except Exception as e:
+                    logger.error(f"An exception occurred while creating constraint {constraint_name}: {e}")
 
-                transaction.commit()
+    def create_graph_focused_on_funds_flow(self, in_memory_graph, batch_size=10000):
+        return self.create_graph_focused_on_funds_flow_bulk([in_memory_graph], batch_size)
+
+    def create_graph_focused_on_funds_flow_bulk(self, in_memory_graphs, batch_size=10000):
+        transactions = [tx for in_memory_graph in in_memory_graphs for tx in in_memory_graph["block"].transactions]
+        with self.session() as session:
+            try:
+                # single managed transaction (and commit) for all given blocks
+                session.execute_write(self._create_funds_flow, transactions, batch_size)
                 return True
 
             except Exception as e:
-                transaction.rollback()
                 logger.error(f"An exception occurred: {e}")
                 return False
 
-            finally:
-                if transaction.closed() is False:
-                    transaction.close()
\ No newline at end of file
+    @staticmethod
+    def _create_funds_flow(transaction, transactions, batch_size):
+        for i in range(0, len(transactions), batch_size):
+            batch_transactions = transactions[i : i + batch_size]
+
+            transaction.run(
+                _Q_MERGE_ADDRESSES,
+                transactions = [
+                    (
+                        tx.timestamp,
+                        tx.from_address.address,
+                        str(tx.to_address.balance),
+                        tx.to_address.address,
+                        str(tx.to_address.balance),
+                    )
+                    for tx in batch_transactions
+                ],
+            )
+            transaction.run(
+                _Q_CREATE_TRANSFERS,
+                transactions = [
+                    (
+                        tx.tx_hash,
+                        tx.block_number,
+                        str(tx.value_wei),
+                        str(tx.gas_used),
+                        tx.timestamp,
+                        tx.symbol,
+                        tx.from_address.address,
+                        tx.to_address.address,
+                    )
+                    for tx in batch_transactions
+                ]
+            )
\ No newline at end of file
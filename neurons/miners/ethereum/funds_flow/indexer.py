@@ -1,8 +1,11 @@
 import os
 import signal
 import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from queue import Queue
 from threading import Thread
-from math import floor
 from neurons.setup_logger import setup_logger
 from neurons.nodes.evm.ethereum.node import EthereumNode
 from neurons.miners.ethereum.funds_flow.graph_creator import GraphCreator
@@ -20,159 +23,225 @@ def shutdown_handler(signum, frame):
     )
     shutdown_flag = True
 
-def index_blocks(_ethereum_node, _graph_creator, _graph_indexer, start_height):
+def index_blocks(_ethereum_node, _graph_creator, _graph_indexer, start_height, flush_every=25, prefetch_size=4):
     global shutdown_flag
     skip_blocks = 6 # Set the number of block confirmations
 
-    while not shutdown_flag:
-        current_block_height = _ethereum_node.get_current_block_height() - 6
-        if current_block_height - skip_blocks < 0:
-            logger.info(f"Waiting min {skip_blocks} for blocks to be mined.")
-            time.sleep(10)
-            continue
-
-        if start_height > current_block_height:
-            logger.info(
-                f"Waiting for new blocks. Current height is {current_block_height}."
-            )
-            time.sleep(10)
-            continue
+    # the next blocks are fetched in the background while the current one is built and written
+    with ThreadPoolExecutor(max_workers=prefetch_size) as executor:
+        while not shutdown_flag:
+            current_block_height = _ethereum_node.get_current_block_height() - 6
+            if current_block_height - skip_blocks < 0:
+                logger.info(f"Waiting min {skip_blocks} for blocks to be mined.")
+                time.sleep(10)
+                continue
 
-        block_height = start_height
-        while block_height <= current_block_height - skip_blocks:
-            block = _ethereum_node.get_block_by_height(block_height)
-            num_transactions = len(block["transactions"])
-            if num_transactions == 0:
-                block_height += 1
+            # same bound as the pass below, otherwise a caught up follower polls the node without sleeping
+            if start_height > current_block_height - skip_blocks:
+                logger.info(
+                    f"Waiting for new blocks. Current height is {current_block_height}."
+                )
+                time.sleep(10)
                 continue
 
-            start_time = time.time()
-            in_memory_graph = _graph_creator.create_in_memory_graph_from_block(block)
-            success = _graph_indexer.create_graph_focused_on_funds_flow(in_memory_graph)
-            end_time = time.time()
-            time_taken = end_time - start_time
-            node_block_height = ethereum_node.get_current_block_height()
-            progress = block_height / node_block_height * 100
-            formatted_num_transactions = "{:>4}".format(num_transactions)
-            formatted_time_taken = "{:6.2f}".format(time_taken)
-            formatted_tps = "{:8.2f}".format(
-                num_transactions / time_taken if time_taken > 0 else float("inf")
-            )
-            formatted_progress = "{:6.2f}".format(progress)
-
-            # if time_taken > 0:
-            #     logger.info(
-            #         "Block {:>6}: Processed {} transactions in {} seconds {} TPS Progress: {}%".format(
-            #             block_height,
-            #             formatted_num_transactions,
-            #             formatted_time_taken,
-            #             formatted_tps,
-            #             formatted_progress,
-            #         )
-            #     )
-            # else:
-            #     logger.info(
-            #         "Block {:>6}: Processed {} transactions in 0.00 seconds (  Inf TPS). Progress: {}%".format(
-            #             block_height, formatted_num_transactions, formatted_progress
-            #         )
-            #     )
-
-            if success:
-                logger.info("Finished Block - {}".format(block_height))
-                block_height += 1
-
-                # indexer flooding prevention
-                threshold = int(os.getenv('BLOCK_PROCESSING_TRANSACTION_THRESHOLD', 500))
-                if num_transactions > threshold:
-                    delay = float(os.getenv('BLOCK_PROCESSING_DELAY', 1))
-                    logger.info(f"Block tx count above {threshold}, slowing down indexing by {delay} seconds to prevent flooding.")
-                    time.sleep(delay)
-
-            else:
-                logger.error(f"Failed to index block {block_height}.")
+            block_height = start_height
+            last_block_height = current_block_height - skip_blocks
+            # blocks are buffered and committed together every flush_every blocks
+            pending_graphs = []
+            num_transactions = 0
+            flush_start_height = block_height
+            # futures for consecutive heights, the head of the deque is always block_height
+            prefetched_blocks = deque()
+            next_prefetch_height = block_height
+            while block_height <= last_block_height:
+                while next_prefetch_height <= last_block_height and len(prefetched_blocks) < prefetch_size:
+                    prefetched_blocks.append(executor.submit(_ethereum_node.get_block_by_height, next_prefetch_height))
+                    next_prefetch_height += 1
+
+                block = prefetched_blocks.popleft().result()
+                num_block_transactions = len(block["transactions"])
+                if num_block_transactions > 0:
+                    pending_graphs.append(_graph_creator.create_in_memory_graph_from_block(block))
+                    num_transactions += num_block_transactions
+
+                if len(pending_graphs) < flush_every and block_height < last_block_height and not shutdown_flag:
+                    block_height += 1
+                    continue
+
+                if not pending_graphs:
+                    block_height += 1
+                    flush_start_height = block_height
+                    if shutdown_flag:
+                        break
+                    continue
+
+                success = _graph_indexer.create_graph_focused_on_funds_flow_bulk(pending_graphs)
+
+                if success:
+                    logger.info("Finished Blocks - {} - {}".format(flush_start_height, block_height))
+
+                    # indexer flooding prevention
+                    threshold = int(os.getenv('BLOCK_PROCESSING_TRANSACTION_THRESHOLD', 500))
+                    if num_transactions > threshold * len(pending_graphs):
+                        delay = float(os.getenv('BLOCK_PROCESSING_DELAY', 1))
+                        logger.info(f"Block tx count above {threshold}, slowing down indexing by {delay} seconds to prevent flooding.")
+                        time.sleep(delay)
+
+                    block_height += 1
+
+                else:
+                    logger.error(f"Failed to index blocks {flush_start_height} - {block_height}.")
+                    time.sleep(30)
+                    # buffered blocks were rolled back, so they are fetched again
+                    block_height = flush_start_height
+                    for future in prefetched_blocks:
+                        future.cancel()
+                    prefetched_blocks.clear()
+                    next_prefetch_height = block_height
+
+                pending_graphs = []
+                num_transactions = 0
+                flush_start_height = block_height
+
+                if shutdown_flag:
+                    logger.info(f"Finished indexing block {block_height} before shutdown.")
+                    break
+
+            # the next pass continues after the blocks indexed by this one
+            start_height = block_height
+
+def fetch_blocks(start_height, last_height, _ethereum_node, raw_block_queue, prefetch_size=32, delay=0):
+    # queues the blocks of start_height - last_height, fetching prefetch_size heights per batched
+    # RPC request, and returns the first height that was not queued so a failed range is resumed
+    time.sleep(delay)
+    block_height = start_height
+    while block_height <= last_height and not shutdown_flag:
+        chunk_last_height = min(block_height + prefetch_size - 1, last_height)
+        blocks = _ethereum_node.get_blocks_by_height_range(block_height, chunk_last_height)
+
+        while block_height <= chunk_last_height and not shutdown_flag:
+            block = blocks.get(block_height) or _ethereum_node.get_block_by_height(block_height)
+            if block is None:
+                logger.error(f"Failed to fetch block {block_height}.")
+                return block_height
+
+            raw_block_queue.put(block)
+            block_height += 1
+
+    return block_height
+
+def build_graphs(_graph_creator, raw_block_queue, graph_queue):
+    # graph creator drives its receipt/balance requests through the thread's event loop
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    while True:
+        block = raw_block_queue.get()
+        if block is None:
+            break
+        num_transactions = len(block["transactions"])
+        if num_transactions == 0:
+            continue
+
+        in_memory_graph = None
+        while in_memory_graph is None:
+            try:
+                in_memory_graph = _graph_creator.create_in_memory_graph_from_block(block)
+            except Exception as e:
+                logger.error(f"Failed to build block {block['number']}: {e}")
+                if shutdown_flag:
+                    break
                 time.sleep(30)
 
-            if shutdown_flag:
-                logger.info(f"Finished indexing block {block_height} before shutdown.")
+        if in_memory_graph is None:
+            continue
+        graph_queue.put(in_memory_graph)
+
+        # indexer flooding prevention
+        threshold = int(os.getenv('BLOCK_PROCESSING_TRANSACTION_THRESHOLD', 500))
+        if num_transactions > threshold:
+            delay = float(os.getenv('BLOCK_PROCESSING_DELAY', 1))
+            logger.info(f"Block tx count above {threshold}, slowing down indexing by {delay} seconds to prevent flooding.")
+            time.sleep(delay)
+
+def write_graphs(_graph_indexer, graph_queue, flush_every):
+    is_done = False
+    while not is_done:
+        pending_graphs = []
+        while len(pending_graphs) < flush_every:
+            in_memory_graph = graph_queue.get()
+            if in_memory_graph is None:
+                is_done = True
+                break
+            pending_graphs.append(in_memory_graph)
+            # do not hold back blocks while the builders are busy
+            if graph_queue.empty():
                 break
 
-def index_blocks_by_last_height(thread_index, start, last, _ethereum_node, _graph_creator, _graph_indexer):
-    global shutdown_flag
-    print('new Thread started : thread number - {}'.format(thread_index + 1))
-    skip_blocks = 6 # Set the number of block confirmations
-    # calculate start_block_height & last_block_height by thread_index and thread_depth
-    start_height = start
-    last_height = last
-    while not shutdown_flag:
-        current_block_height = last_height - 6
-        if current_block_height - skip_blocks < 0:
-            logger.info(f"Waiting min {skip_blocks} for blocks to be mined.")
-            time.sleep(10)
+        if not pending_graphs:
             continue
 
-        if start_height > current_block_height:
-            logger.info(
-                f"Waiting for new blocks. Current height is {current_block_height}."
-            )
-            time.sleep(10)
-            continue
+        block_numbers = [in_memory_graph["block"].block_number for in_memory_graph in pending_graphs]
+        success = _graph_indexer.create_graph_focused_on_funds_flow_bulk(pending_graphs)
+        while not success and not shutdown_flag:
+            logger.error(f"Failed to index blocks {block_numbers}.")
+            time.sleep(30)
+            success = _graph_indexer.create_graph_focused_on_funds_flow_bulk(pending_graphs)
+
+        if success:
+            logger.info("Finished Blocks - {}".format(block_numbers))
+        else:
+            logger.error(f"Failed to index blocks {block_numbers} before shutdown.")
+
+def index_blocks_pipeline(start_height, last_height, _ethereum_node, _graph_creator, _graph_indexer, num_fetchers, num_builders, num_writers, flush_every=25, bucket_size=1000):
+    # fetching (RPC), building (RPC + CPU) and writing (graph commits) run as separate stages,
+    # so a slow commit does not stall the next block fetch
+    raw_block_queue = Queue(maxsize=num_builders * 4)
+    graph_queue = Queue(maxsize=num_writers * flush_every)
+
+    builders = [Thread(target=build_graphs, args=(_graph_creator, raw_block_queue, graph_queue)) for _ in range(num_builders)]
+    writers = [Thread(target=write_graphs, args=(_graph_indexer, graph_queue, flush_every)) for _ in range(num_writers)]
+    for thread in builders + writers:
+        thread.start()
 
-        block_height = start_height
-        while block_height <= current_block_height - skip_blocks:
-            block = _ethereum_node.get_block_by_height(block_height)
-            num_transactions = len(block["transactions"])
-            if num_transactions == 0:
-                block_height += 1
-                continue
-            start_time = time.time()
-            in_memory_graph = _graph_creator.create_in_memory_graph_from_block(block)
-            success = _graph_indexer.create_graph_focused_on_funds_flow(in_memory_graph)
-            end_time = time.time()
-            time_taken = end_time - start_time
-            progress = (block_height - start_height) / (last_height - start_height) * 100
-            formatted_num_transactions = "{:>4}".format(num_transactions)
-            formatted_time_taken = "{:6.2f}".format(time_taken)
-            formatted_tps = "{:8.2f}".format(
-                num_transactions / time_taken if time_taken > 0 else float("inf")
-            )
-            formatted_progress = "{:6.2f}".format(progress)
-
-            # if time_taken > 0:
-            #     logger.info(
-            #         "Thread Index {} Block {:>6}: Processed {} transactions in {} seconds {} TPS Progress: {}%".format(
-            #             thread_index,
-            #             block_height,
-            #             formatted_num_transactions,
-            #             formatted_time_taken,
-            #             formatted_tps,
-            #             formatted_progress,
-            #         )
-            #     )
-            # else:
-            #     logger.info(
-            #         "Thread Index {} Block {:>6}: Processed {} transactions in 0.00 seconds (  Inf TPS). Progress: {}%".format(
-            #             thread_index, block_height, formatted_num_transactions, formatted_progress
-            #         )
-            #     )
-
-            if success:
-                logger.info("Finished Block - {}".format(block_height))
-                block_height += 1
-
-                # indexer flooding prevention
-                threshold = int(os.getenv('BLOCK_PROCESSING_TRANSACTION_THRESHOLD', 500))
-                if num_transactions > threshold:
-                    delay = float(os.getenv('BLOCK_PROCESSING_DELAY', 1))
-                    logger.info(f"Block tx count above {threshold}, slowing down indexing by {delay} seconds to prevent flooding.")
-                    time.sleep(delay)
-
-            else:
-                logger.error(f"Failed to index block {block_height}.")
-                time.sleep(30)
-
-            if shutdown_flag:
-                logger.info(f"Finished indexing block {block_height} before shutdown.")
-                break
+    # the range is fetched as buckets of bucket_size blocks, a fetcher that is done picks up the next
+    # bucket, and a bucket that failed is resumed where it stopped after an exponential backoff
+    with ThreadPoolExecutor(max_workers=num_fetchers) as executor:
+        buckets = {}
+        for bucket_start_height in range(start_height, last_height + 1, bucket_size):
+            bucket_last_height = min(bucket_start_height + bucket_size - 1, last_height)
+            future = executor.submit(fetch_blocks, bucket_start_height, bucket_last_height, _ethereum_node, raw_block_queue)
+            buckets[future] = (bucket_start_height, bucket_last_height, 0)
+
+        while buckets:
+            for future in as_completed(list(buckets)):
+                bucket_start_height, bucket_last_height, num_retries = buckets.pop(future)
+                try:
+                    next_height = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to fetch blocks {bucket_start_height} - {bucket_last_height}: {e}")
+                    next_height = bucket_start_height
+
+                if next_height > bucket_last_height:
+                    logger.info(f"Fetched blocks {bucket_start_height} - {bucket_last_height}.")
+                    continue
+                if shutdown_flag:
+                    continue
+
+                delay = min(2 ** num_retries, 60)
+                logger.info(f"Retrying blocks {next_height} - {bucket_last_height} in {delay} seconds...")
+                future = executor.submit(fetch_blocks, next_height, bucket_last_height, _ethereum_node, raw_block_queue, delay=delay)
+                buckets[future] = (next_height, bucket_last_height, num_retries + 1)
+
+    # stages are stopped one after another, so queued blocks are still written on shutdown
+    for _ in builders:
+        raw_block_queue.put(None)
+    for thread in builders:
+        thread.join()
+    for _ in writers:
+        graph_queue.put(None)
+    for thread in writers:
+        thread.join()
+
+    logger.info(f"Finished indexing blocks {start_height} - {last_height}.")
 
 # Register the shutdown handler for SIGINT and SIGTERM
 signal.signal(signal.SIGINT, shutdown_handler)
@@ -182,16 +251,30 @@ if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv()
 
-    ethereum_node = EthereumNode()
-    graph_creator = GraphCreator()
-    graph_indexer = GraphIndexer()
-
     num_threads = 8 # set number of thread 8 by default
     num_thread_str = os.getenv('ETHEREUM_THREAD_CNT', None)
 
     if num_thread_str is not None:
         num_threads = int(num_thread_str)
 
+    # threads per pipeline stage, ETHEREUM_THREAD_CNT by default
+    num_fetchers = int(os.getenv('ETHEREUM_FETCHER_CNT', num_threads))
+    num_builders = int(os.getenv('ETHEREUM_BUILDER_CNT', num_threads))
+    num_writers = int(os.getenv('ETHEREUM_WRITER_CNT', num_threads))
+
+    # every writer thread plus the main thread writes through the shared driver pool
+    pool_size_str = os.getenv('GRAPH_DB_POOL_SIZE', None)
+    if pool_size_str is not None:
+        pool_size = int(pool_size_str)
+    else:
+        pool_size = max(num_writers * 2, 50)
+
+    ethereum_node = EthereumNode()
+    graph_creator = GraphCreator()
+    graph_indexer = GraphIndexer(max_connection_pool_size=pool_size)
+
+    flush_every = int(os.getenv('ETHEREUM_FLUSH_EVERY', 25))
+
     retry_delay = 60
 
     start_height = 0
@@ -214,11 +297,9 @@ if __name__ == "__main__":
             last_height = current_block_height
     else:
         last_height = current_block_height
-    
-    thread_depth = floor((last_height - start_height) / num_threads)
-    restHeight = (last_height - start_height) % num_threads
-
-    threads = []
+    # stay as many confirmations behind the tip as index_blocks (6 + skip_blocks), a reorg can still
+    # replace later blocks and the tip follower picks up from there
+    last_height = min(last_height, current_block_height - 12)
     
     logger.info("Starting indexer")
     logger.info(f"Starting from block height: {start_height}")
@@ -226,13 +307,8 @@ if __name__ == "__main__":
     logger.info(f"Latest indexed block height: {graph_last_block_height}")
     # indexing all old historical tx
     graph_indexer.create_indexes()
-    for i in range(num_threads):
-        start = start_height + i * thread_depth
-        last = start_height + (i + 1) * thread_depth - 1
-        if i == num_threads - 1:
-            last = start_height + (i + 1) * thread_depth + restHeight
-        thread = Thread(target=index_blocks_by_last_height, args=(i, start, last, ethereum_node, graph_creator, graph_indexer))
-        thread.start()
+    pipeline_thread = Thread(target=index_blocks_pipeline, args=(start_height, last_height, ethereum_node, graph_creator, graph_indexer, num_fetchers, num_builders, num_writers, flush_every))
+    pipeline_thread.start()
 
     # while threads're indexing old tx data
     # indexing recent blocks
@@ -243,7 +319,7 @@ if __name__ == "__main__":
             logger.info("Starting indexing blocks...")
 
             logger.info('-- Main thread is running for indexing recent blocks --')
-            index_blocks(ethereum_node, graph_creator, graph_indexer, last_height + 1)
+            index_blocks(ethereum_node, graph_creator, graph_indexer, last_height + 1, flush_every)
             
             break
         except Exception as e:
@@ -251,6 +327,9 @@ if __name__ == "__main__":
             logger.error(f"Retry failed with error: {e}")
             logger.info(f"Retrying in {retry_delay} seconds...")
             time.sleep(retry_delay)
-        finally:
-            graph_indexer.close()
-            logger.info("Indexer stopped")
+
+    # only on shutdown, a retried tip follower still writes through the driver
+    pipeline_thread.join()
+    graph_indexer.close()
+    logger.info("Indexer stopped")
+
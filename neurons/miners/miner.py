@@ -1,4 +1,5 @@
 import argparse
+import asyncio
 import os
 import time
 import typing
@@ -79,13 +80,17 @@ class Miner(BaseMinerNeuron):
 
         return config
     
-    def __init__(self, config=None):
-        config = Miner.get_config()
+    def __init__(self, config=None, miner_config=None):
+        config = config or Miner.get_config()
         
         super(Miner, self).__init__(config=config)
         
+        # uid by hotkey, so blacklist and priority checks do not scan metagraph.hotkeys per request
+        self.hotkey_to_uid = {hotkey: uid for uid, hotkey in enumerate(self.metagraph.hotkeys)}
 
         self.request_timestamps: dict = {}
+
+        self.miner_config = miner_config or MinerConfig().load_and_get_config_values()
         
         self.axon = bt.axon(wallet=self.wallet, port=self.config.axon.port)        
         # Attach determiners which functions are called when servicing a request.
@@ -105,47 +110,63 @@ class Miner(BaseMinerNeuron):
         )
 
         #to_remove_after_merge:
-        self.axon.attach(
-            forward_fn=self.deprecated_block_check,
-            blacklist_fn=self.deprecated_block_check_blacklist,
-            priority_fn=self.deprecated_block_check_priority,
-        ).attach(
-            forward_fn=self.deprecated_discovery,
-            blacklist_fn=self.deprecated_discovery_blacklist,
-            priority_fn=self.deprecated_discovery_priority,
-        ).attach(
-            forward_fn=self.deprecated_query,
-            blacklist_fn=self.deprecated_query_blacklist,
-            priority_fn=self.deprecated_query_priority,
-        )
+        # every attached route adds to the axon's per request dispatch, serve the old synapses only while asked to
+        if self.miner_config.support_deprecated:
+            self.axon.attach(
+                forward_fn=self.deprecated_block_check,
+                blacklist_fn=self.deprecated_block_check_blacklist,
+                priority_fn=self.deprecated_block_check_priority,
+            ).attach(
+                forward_fn=self.deprecated_discovery,
+                blacklist_fn=self.deprecated_discovery_blacklist,
+                priority_fn=self.deprecated_discovery_priority,
+            ).attach(
+                forward_fn=self.deprecated_query,
+                blacklist_fn=self.deprecated_query_blacklist,
+                priority_fn=self.deprecated_query_priority,
+            )
 
         bt.logging.info(f"Axon created: {self.axon}")
 
         self.graph_search = get_graph_search(config)
 
-        self.miner_config = MinerConfig().load_and_get_config_values()        
-
 
     
-    async def block_check(self, synapse: protocol.BlockCheck) -> protocol.BlockCheck:
+    # graph database calls block, the handlers run them in threads so the axon keeps serving other requests
+    def _do_block_check(self, synapse, output_cls):
         try:
             block_heights = synapse.blocks_to_check
             data_samples = self.graph_search.get_block_transactions(block_heights)
-            synapse.output = protocol.BlockCheckOutput(
+            synapse.output = output_cls(
                 data_samples=data_samples,
             )
-            bt.logging.info(f"Serving miner random block check output: {synapse.output}")
+            bt.logging.info(f"Serving miner random block check output: {len(data_samples)} data samples")
+            # formatting the whole output is costly, only do it when it is logged
+            if bt.logging.__trace_on__:
+                bt.logging.trace(f"Serving miner random block check output: {synapse.output}")
+        except Exception as e:
+            bt.logging.error(traceback.format_exc())
+            synapse.output = None
+        return synapse
+
+    def _do_query(self, synapse):
+        try:
+            synapse.output = self.graph_search.execute_query(
+                network=synapse.network, query=synapse.query)
         except Exception as e:
             bt.logging.error(traceback.format_exc())
             synapse.output = None
         return synapse
+
+    async def block_check(self, synapse: protocol.BlockCheck) -> protocol.BlockCheck:
+        return await asyncio.to_thread(self._do_block_check, synapse, protocol.BlockCheckOutput)
             
     async def discovery(self, synapse: protocol.Discovery ) -> protocol.Discovery:
         try:
-            block_range = self.graph_search.get_block_range()
+            block_range = await asyncio.to_thread(self.graph_search.get_block_range)
             start_block = block_range['start_block_height']
             last_block = block_range['latest_block_height']
-            run_id = self.graph_search.get_run_id()
+            run_id = await asyncio.to_thread(self.graph_search.get_run_id)
 
             synapse.output = protocol.DiscoveryOutput(
                 metadata=protocol.DiscoveryMetadata(
@@ -156,20 +177,16 @@ class Miner(BaseMinerNeuron):
                 block_height=last_block,
                 run_id=run_id,
             )
-            bt.logging.info(f"Serving miner discovery output: {synapse.output}")
+            bt.logging.info(f"Serving miner discovery output: blocks {start_block}-{last_block}, {run_id=}")
+            if bt.logging.__trace_on__:
+                bt.logging.trace(f"Serving miner discovery output: {synapse.output}")
         except Exception as e:
             bt.logging.error(traceback.format_exc())
             synapse.output = None
         return synapse
 
     async def query(self, synapse: protocol.Query ) -> protocol.Query:
-        try:
-            synapse.output = self.graph_search.execute_query(
-                network=synapse.network, query=synapse.query)
-        except Exception as e:
-            bt.logging.error(traceback.format_exc())
-            synapse.output = None
-        return synapse
+        return await asyncio.to_thread(self._do_query, synapse)
 
     async def block_check_blacklist(self, synapse: protocol.BlockCheck) -> typing.Tuple[bool, str]:
         return blacklist.base_blacklist(self, synapse=synapse)
@@ -182,9 +199,7 @@ class Miner(BaseMinerNeuron):
 
 
     def base_priority(self, synapse: bt.Synapse) -> float:
-        caller_uid = self.metagraph.hotkeys.index(
-            synapse.dendrite.hotkey
-        ) 
+        caller_uid = self.hotkey_to_uid[synapse.dendrite.hotkey]
         prirority = float(
             self.metagraph.S[caller_uid]
         )
@@ -204,7 +219,8 @@ class Miner(BaseMinerNeuron):
 
     def resync_metagraph(self):
         super(Miner, self).resync_metagraph()
-        store_miner_metadata(self.config, self.graph_search, self.wallet)
+        self.hotkey_to_uid = {hotkey: uid for uid, hotkey in enumerate(self.metagraph.hotkeys)}
+        store_miner_metadata(self.config, self.graph_search, self.wallet, self.subtensor)
 
     def save_state(self):
         #empty function to remove logging WARNING
@@ -230,26 +246,17 @@ class Miner(BaseMinerNeuron):
         return blacklist.query_blacklist(self, synapse=synapse)
 
     async def deprecated_block_check(self, synapse: protocol.MinerRandomBlockCheck) -> protocol.MinerRandomBlockCheck:
-        try:
-            block_heights = synapse.blocks_to_check
-            data_samples = self.graph_search.get_block_transactions(block_heights)
-            synapse.output = protocol.MinerRandomBlockCheckOutput(
-                data_samples=data_samples,
-            )
-            bt.logging.info(f"Serving miner random block check output: {synapse.output}")
-        except Exception as e:
-            bt.logging.error(traceback.format_exc())
-            synapse.output = None
-        return synapse
+        return await asyncio.to_thread(self._do_block_check, synapse, protocol.MinerRandomBlockCheckOutput)
             
     async def deprecated_discovery(self, synapse: protocol.MinerDiscovery ) -> protocol.MinerDiscovery:
         try:
-            block_range = self.graph_search.get_block_range()
+            block_range = await asyncio.to_thread(self.graph_search.get_block_range)
             start_block = block_range['start_block_height']
             last_block = block_range['latest_block_height']
-            run_id = self.graph_search.get_run_id()
+            run_id = await asyncio.to_thread(self.graph_search.get_run_id)
+            # sample() indexes into the range, it does not build the list of heights, and the heights must be distinct
             block_heights = sample(range(start_block, last_block + 1), 10)
-            data_samples = self.graph_search.get_block_transactions(block_heights)
+            data_samples = await asyncio.to_thread(self.graph_search.get_block_transactions, block_heights)
 
             synapse.output = protocol.MinerDiscoveryOutput(
                 metadata=protocol.MinerDiscoveryMetadata(
@@ -262,31 +269,27 @@ class Miner(BaseMinerNeuron):
                 run_id=run_id,
                 version=4
             )
-            bt.logging.info(f"Serving miner discovery output: {synapse.output}")
+            bt.logging.info(f"Serving miner discovery output: blocks {start_block}-{last_block}, {run_id=}")
+            if bt.logging.__trace_on__:
+                bt.logging.trace(f"Serving miner discovery output: {synapse.output}")
         except Exception as e:
             bt.logging.error(traceback.format_exc())
             synapse.output = None
         return synapse
 
     async def deprecated_query(self, synapse: protocol.MinerQuery ) -> protocol.MinerQuery:
-        try:
-            synapse.output = self.graph_search.execute_query(
-                network=synapse.network, query=synapse.query)
-        except Exception as e:
-            bt.logging.error(traceback.format_exc())
-            synapse.output = None
-        return synapse
+        return await asyncio.to_thread(self._do_query, synapse)
 
 
-def wait_for_blocks_sync():
+def wait_for_blocks_sync(config=None, miner_config=None):
         is_synced=False
 
-        config = Miner.get_config()
+        config = config or Miner.get_config()
         if not config.wait_for_sync:
             bt.logging.info(f"Skipping graph sync.")
             return is_synced
         
-        miner_config = MinerConfig().load_and_get_config_values()
+        miner_config = miner_config or MinerConfig().load_and_get_config_values()
         delta = miner_config.get_blockchain_sync_delta(config.network)
         bt.logging.info(f"Waiting for graph model to sync with blockchain.")
         while not is_synced:
@@ -315,8 +318,12 @@ if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv()
 
-    wait_for_blocks_sync()
-    with Miner() as miner:
+    # parsed once, the miner reuses what the graph sync check loaded
+    config = Miner.get_config()
+    miner_config = MinerConfig().load_and_get_config_values()
+
+    wait_for_blocks_sync(config, miner_config)
+    with Miner(config=config, miner_config=miner_config) as miner:
         while True:
             bt.logging.info(f"Miner running")
             time.sleep(bt.__blocktime__*2)
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 
-import concurrent
+import concurrent.futures
 
 class Node(ABC):
     def __init__(self):
@@ -25,18 +25,30 @@ class Node(ABC):
         is_valid = len(block_data["tx"]) == data_sample["transaction_count"]
         return is_valid
 
-    def validate_all_data_samples(self, data_samples, blocks_to_check):
+    def get_blocks_by_heights(self, block_heights):
+        # a block the node could not return maps to None
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            blocks = executor.map(self.get_block_by_height, block_heights)
+            return dict(zip(block_heights, blocks))
+
+    def validate_all_data_samples(self, data_samples, blocks_to_check, blocks=None):
+        # True or False judges the miner's samples, None means the node could not provide every block to judge them
         if len(data_samples) != len(blocks_to_check):
             return False
-        
-        for sample in data_samples:
-            if sample['block_height'] not in blocks_to_check:
-                return False
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self.validate_data_sample, sample) for sample in data_samples]
+        # blocks_to_check holds distinct heights, so this also rejects samples repeating a block
+        block_heights = [sample['block_height'] for sample in data_samples]
+        if set(block_heights) != set(blocks_to_check):
+            return False
 
-            for future in concurrent.futures.as_completed(futures):
-                if not future.result():
-                    return False
-        return True 
+        # every sampled block is fetched in one go, nodes that support it batch the RPC calls
+        if blocks is None:
+            blocks = self.get_blocks_by_heights(block_heights)
+        is_complete = True
+        for sample in data_samples:
+            block_data = blocks.get(sample['block_height'])
+            if block_data is None:
+                is_complete = False
+            elif len(block_data["tx"]) != sample["transaction_count"]:
+                return False
+        return True if is_complete else None
@@ -1,5 +1,5 @@
 import bittensor as bt
-from bitcoinrpc.authproxy import AuthServiceProxy
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException
 
 
 from neurons.nodes.abstract_node import Node
@@ -70,6 +70,40 @@ class BitcoinNode(Node):
         finally:
             rpc_connection._AuthServiceProxy__conn.close()  # Close the connection
 
+    def get_blocks_by_heights(self, block_heights): # get blocks with one batched getblockhash and one batched getblock request
+        # a block the node could not return maps to None, connection errors are raised
+        rpc_connection = AuthServiceProxy(self.node_rpc_url)
+        try:
+            block_hashes = self.batch_or_each(rpc_connection, [["getblockhash", block_height] for block_height in block_heights])
+            # verbosity 1 lists the txids only, which is all the transaction count needs
+            hashed_heights = [block_height for block_height, block_hash in zip(block_heights, block_hashes) if block_hash is not None]
+            blocks = self.batch_or_each(rpc_connection, [["getblock", block_hash, 1] for block_hash in block_hashes if block_hash is not None])
+            blocks_by_height = dict.fromkeys(block_heights)
+            blocks_by_height.update(zip(hashed_heights, blocks))
+            return blocks_by_height
+        finally:
+            rpc_connection._AuthServiceProxy__conn.close()  # Close the connection
+
+    @staticmethod
+    def batch_or_each(rpc_connection, rpc_calls):
+        # batch_ raises for the whole batch when any call errors, the calls are then repeated one by one
+        # so only the failing ones come back as None
+        if not rpc_calls:
+            return []
+        try:
+            return rpc_connection.batch_([list(rpc_call) for rpc_call in rpc_calls])
+        except JSONRPCException as e:
+            logger.error(f"RPC Provider with Error: {e}")
+
+        results = []
+        for method, *params in rpc_calls:
+            try:
+                results.append(getattr(rpc_connection, method)(*params))
+            except JSONRPCException as e:
+                logger.error(f"RPC Provider with Error: {e}")
+                results.append(None)
+        return results
+
     def get_transaction_by_hash(self, tx_hash):
         logger.error(f"get_transaction_by_hash not implemented for BitcoinNode")
         raise NotImplementedError()
@@ -81,30 +115,68 @@ class BitcoinNode(Node):
             rpc_connection = AuthServiceProxy(self.node_rpc_url)
             try:
                 txn_data = rpc_connection.getrawtransaction(str(txn_id), 1)
-                vout = next((x for x in txn_data['vout'] if str(x['n']) == vout_id), None)
-                amount = int(vout['value'] * 100000000)
-                address = vout["scriptPubKey"].get("address", "")
-                script_pub_key_asm = vout["scriptPubKey"].get("asm", "")
-                if not address:
-                    addresses = vout["scriptPubKey"].get("addresses", [])
-                    if addresses:
-                        address = addresses[0]
-                    elif "OP_CHECKSIG" in script_pub_key_asm:
-                        pubkey = script_pub_key_asm.split()[0]
-                        address = pubkey_to_address(pubkey)
-                    elif "OP_CHECKMULTISIG" in script_pub_key_asm:
-                        pubkeys = script_pub_key_asm.split()[1:-2]
-                        m = int(script_pub_key_asm.split()[0])
-                        redeem_script = construct_redeem_script(pubkeys, m)
-                        hashed_script = hash_redeem_script(redeem_script)
-                        address = create_p2sh_address(hashed_script)
-                    else:
-                        raise Exception(
-                            f"Unknown address type: {vout['scriptPubKey']}"
-                        )
-                return address, amount
+                return self.get_address_and_amount_from_txn_data(txn_data, vout_id)
             finally:
                 rpc_connection._AuthServiceProxy__conn.close()  # Close the connection
         else: # get from hash table if exists
             address, amount = self.tx_out_hash_table[txn_id[:3]][(txn_id, vout_id)]
             return address, int(amount)
+
+    def get_addresses_and_amounts_by_txn_ids_and_vout_ids(self, txn_vout_ids, batch_size=500):
+        # resolves many (txn_id, vout_id) pairs at once, returns {(txn_id, vout_id): (address, amount)}
+        results = {}
+        missing_txn_vout_ids = []
+        for txn_id, vout_id in txn_vout_ids:
+            if (txn_id, vout_id) in self.tx_out_hash_table[txn_id[:3]]:
+                address, amount = self.tx_out_hash_table[txn_id[:3]][(txn_id, vout_id)]
+                results[(txn_id, vout_id)] = (address, int(amount))
+            else:
+                missing_txn_vout_ids.append((txn_id, vout_id))
+
+        if not missing_txn_vout_ids:
+            return results
+
+        # missing transactions are fetched with JSON-RPC batch requests, one HTTP round-trip per batch,
+        # bitcoind answers a batch in request order
+        missing_txn_ids = list(dict.fromkeys(txn_id for txn_id, _ in missing_txn_vout_ids))
+        txn_data_by_id = {}
+        rpc_connection = AuthServiceProxy(self.node_rpc_url)
+        try:
+            for i in range(0, len(missing_txn_ids), batch_size):
+                batch_txn_ids = missing_txn_ids[i : i + batch_size]
+                batch_txn_data = self.batch_or_each(rpc_connection, [["getrawtransaction", str(txn_id), 1] for txn_id in batch_txn_ids])
+                txn_data_by_id.update(zip(batch_txn_ids, batch_txn_data))
+        finally:
+            rpc_connection._AuthServiceProxy__conn.close()  # Close the connection
+
+        for txn_id, vout_id in missing_txn_vout_ids:
+            txn_data = txn_data_by_id[txn_id]
+            if txn_data is None:
+                raise ValueError(f"Transaction {txn_id} could not be fetched from the node")
+            results[(txn_id, vout_id)] = self.get_address_and_amount_from_txn_data(txn_data, vout_id)
+        return results
+
+    @staticmethod
+    def get_address_and_amount_from_txn_data(txn_data, vout_id: str):
+        vout = next((x for x in txn_data['vout'] if str(x['n']) == vout_id), None)
+        amount = int(vout['value'] * 100000000)
+        address = vout["scriptPubKey"].get("address", "")
+        script_pub_key_asm = vout["scriptPubKey"].get("asm", "")
+        if not address:
+            addresses = vout["scriptPubKey"].get("addresses", [])
+            if addresses:
+                address = addresses[0]
+            elif "OP_CHECKSIG" in script_pub_key_asm:
+                pubkey = script_pub_key_asm.split()[0]
+                address = pubkey_to_address(pubkey)
+            elif "OP_CHECKMULTISIG" in script_pub_key_asm:
+                pubkeys = script_pub_key_asm.split()[1:-2]
+                m = int(script_pub_key_asm.split()[0])
+                redeem_script = construct_redeem_script(pubkeys, m)
+                hashed_script = hash_redeem_script(redeem_script)
+                address = create_p2sh_address(hashed_script)
+            else:
+                raise Exception(
+                    f"Unknown address type: {vout['scriptPubKey']}"
+                )
+        return address, amount
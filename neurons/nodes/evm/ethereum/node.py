@@ -2,13 +2,14 @@ import argparse
 import asyncio
 import os
 
+import requests
 from aiohttp import ClientSession
 
 import bittensor as bt
 from web3 import Web3
 from neurons.nodes.abstract_node import Node
 from neurons.setup_logger import setup_logger
-from neurons.nodes.evm.ethereum.node_utils import async_rpc_request
+from neurons.nodes.evm.ethereum.node_utils import async_rpc_request, format_rpc_block
 
 parser = argparse.ArgumentParser()
 bt.logging.add_args(parser)
@@ -48,6 +49,26 @@ class EthereumNode(Node):
         finally:
             web3.provider = None # Close the connection
 
+    def get_blocks_by_height_range(self, start_height, last_height): # get blocks in one JSON-RPC batch request
+        try:
+            payload = [
+                {"jsonrpc": "2.0", "method": "eth_getBlockByNumber", "params": [hex(block_height), False], "id": block_height}
+                for block_height in range(start_height, last_height + 1)
+            ]
+            response = requests.post(self.node_rpc_url, json=payload, timeout=60)
+            response.raise_for_status()
+
+            blocks = {}
+            for result in response.json():
+                if result.get("result") is None:
+                    logger.error(f"RPC Provider with Error: {result.get('error')}")
+                    continue
+                blocks[result["id"]] = format_rpc_block(result["result"])
+            return blocks
+        except Exception as e:
+            logger.error(f"RPC Provider with Error: {e}")
+            return {}
+
     def get_transaction_by_hash(self, tx_hash): # get the transaction details from tx hash
         web3 = Web3(Web3.HTTPProvider(self.node_rpc_url))
         try:
@@ -1,3 +1,4 @@
+from hexbytes import HexBytes
 from web3.providers.base import JSONBaseProvider
 
 # asynchronous JSON RPC API request
@@ -9,3 +10,15 @@ async def async_rpc_request(session, url, method, params):
         content = await response.read()
     response = base_provider.decode_rpc_response(content)
     return response
+
+# shape a raw eth_getBlockByNumber result (without full transactions) like web3.eth.get_block does
+def format_rpc_block(block):
+    formatted_block = dict(block)
+    for key in ["number", "timestamp", "totalDifficulty", "difficulty", "gasUsed", "gasLimit"]:
+        if block.get(key) is not None:
+            formatted_block[key] = int(block[key], 16)
+    for key in ["hash", "parentHash", "nonce"]:
+        if block.get(key) is not None:
+            formatted_block[key] = HexBytes(block[key])
+    formatted_block["transactions"] = [HexBytes(tx) for tx in block["transactions"]]
+    return formatted_block
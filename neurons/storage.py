@@ -39,18 +39,17 @@ class ValidatorMetadata(Metadata):
             data_dict[key] = value.strip("'")
         return ValidatorMetadata(**data_dict)
 
-def get_commitment_wrapper(subtensor, netuid, _, hotkey, block=None):
-    def get_commitment():
-        metadata = serving.get_metadata(subtensor, netuid, hotkey, block)
-        if metadata is None:
-            return None
-        commitment = metadata["info"]["fields"][0]
-        hex_data = commitment[list(commitment.keys())[0]][2:]
-        return bytes.fromhex(hex_data).decode()
+def decode_commitment(metadata) -> Optional[str]:
+    if metadata is None:
+        return None
+    commitment = metadata["info"]["fields"][0]
+    hex_data = commitment[list(commitment.keys())[0]][2:]
+    return bytes.fromhex(hex_data).decode()
 
-    return get_commitment()
+def get_commitment_wrapper(subtensor, netuid, _, hotkey, block=None):
+    return decode_commitment(serving.get_metadata(subtensor, netuid, hotkey, block))
 
-def store_miner_metadata(config, graph_search, wallet):
+def store_miner_metadata(config, graph_search, wallet, subtensor=None):
     def get_metadata():
         run_id = graph_search.get_run_id()
         docker_image = get_docker_image_version()
@@ -65,7 +64,8 @@ def store_miner_metadata(config, graph_search, wallet):
 
 
     try:
-        subtensor = bt.subtensor(config=config)
+        # reuse the neuron's chain connection, a new subtensor opens another websocket
+        subtensor = subtensor or bt.subtensor(config=config)
         bt.logging.info(f"Storing miner metadata")
         metadata = get_metadata()
         subtensor.commit(wallet, config.netuid, Metadata.to_compact(metadata))
@@ -76,9 +76,9 @@ def store_miner_metadata(config, graph_search, wallet):
     except Exception as e:
         bt.logging.warning(f"Skipping storing miner metadata, error: {e}")
 
-def store_validator_metadata(config, wallet, uid):
+def store_validator_metadata(config, wallet, uid, subtensor=None):
 
-    subtensor = bt.subtensor(config=config)
+    subtensor = subtensor or bt.subtensor(config=config)
 
     try:
         docker_image = get_docker_image_version()
@@ -91,16 +91,9 @@ def store_validator_metadata(config, wallet, uid):
         hotkey= wallet.hotkey.ss58_address
 
         def get_commitment(netuid: int, uid: int, block: Optional[int] = None) -> str:
-            metadata = serving.get_metadata(subtensor, netuid, hotkey, block)
-            if metadata is None:
-                return None
-            commitment = metadata["info"]["fields"][0]
-            hex_data = commitment[list(commitment.keys())[0]][2:]
-            return bytes.fromhex(hex_data).decode()
+            return decode_commitment(serving.get_metadata(subtensor, netuid, hotkey, block))
 
-        subtensor.get_commitment = get_commitment
-
-        existing_commitment = subtensor.get_commitment(config.netuid, uid)
+        existing_commitment = get_commitment(config.netuid, uid)
         if existing_commitment is not None:
             dual_miner = MinerMetadata.from_compact(existing_commitment)
             if dual_miner.ri is not None:
@@ -114,25 +107,34 @@ def store_validator_metadata(config, wallet, uid):
     except Exception as e:
         bt.logging.warning(f"Skipping storing miner metadata, error: {e}")
 
-def get_miners_metadata(config, metagraph):
+def get_all_commitments(subtensor, netuid):
+    # one paged storage query for the whole subnet instead of a round trip per hotkey
+    commitments = subtensor.substrate.query_map(
+        module="Commitments",
+        storage_function="CommitmentOf",
+        params=[netuid],
+    )
+    return {hotkey.value: metadata.value for hotkey, metadata in commitments}
+
+def get_miners_metadata(config, metagraph, subtensor=None):
     miners_metadata = {}
     bt.logging.info(f"Getting miners metadata")
 
-    subtensor = bt.subtensor(config=config)
+    subtensor = subtensor or bt.subtensor(config=config)
+    try:
+        commitments = get_all_commitments(subtensor, config.netuid)
+    except Exception as e:
+        bt.logging.warning(f"Error while getting all commitments, falling back to one query per hotkey: {e}")
+        commitments = None
+
     for axon in metagraph.axons:
         if axon.is_serving:
             hotkey = axon.hotkey
-            def get_commitment(netuid: int, uid: int, block: Optional[int] = None) -> str:
-                metadata = serving.get_metadata(subtensor, netuid, hotkey, block)
-                if metadata is None:
-                    return None
-                commitment = metadata["info"]["fields"][0]
-                hex_data = commitment[list(commitment.keys())[0]][2:]
-                return bytes.fromhex(hex_data).decode()
-
-            subtensor.get_commitment = get_commitment
             try:
-                metadata_str = subtensor.get_commitment(config.netuid, 0)
+                if commitments is not None:
+                    metadata_str = decode_commitment(commitments.get(hotkey))
+                else:
+                    metadata_str = decode_commitment(serving.get_metadata(subtensor, config.netuid, hotkey))
                 if metadata_str is None:
                     continue
                 metadata = MinerMetadata.from_compact(metadata_str)
@@ -141,4 +143,4 @@ def get_miners_metadata(config, metagraph):
                 bt.logging.warning(f"Error while getting miner metadata for {hotkey}, Skipping...")
                 continue
 
-    return miners_metadata
\ No newline at end of file
+    return miners_metadata
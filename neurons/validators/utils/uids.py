@@ -1,5 +1,4 @@
 import torch
-import random
 import bittensor as bt
 from typing import List
 
@@ -29,29 +28,42 @@ def check_uid_availability(
     return True
 
 
+def get_available_uids_mask(
+    metagraph: "bt.metagraph.Metagraph", vpermit_tao_limit: int
+) -> torch.BoolTensor:
+    """Vectorized check_uid_availability over all uids of the metagraph.
+    Args:
+        metagraph (:obj: bt.metagraph.Metagraph): Metagraph object
+        vpermit_tao_limit (int): Validator permit tao limit
+    Returns:
+        mask (torch.BoolTensor): True at the index of every available uid.
+    """
+    # is_serving is false for axons without IP, which also covers the IP check of check_uid_availability
+    is_serving = torch.tensor([axon.is_serving for axon in metagraph.axons], dtype=torch.bool)
+    has_validator_permit = torch.as_tensor(metagraph.validator_permit, dtype=torch.bool)
+    is_below_limit = torch.as_tensor(metagraph.S) < vpermit_tao_limit
+    return is_serving & (~has_validator_permit | is_below_limit)
+
+
 def get_random_uids(
-    self, k: int, exclude: List[int] = None
+    self, k: int, exclude: List[int] = None, available_uids_mask: torch.BoolTensor = None
 ) -> torch.LongTensor:
     """Returns k available random uids from the metagraph.
     Args:
         k (int): Number of uids to return.
         exclude (List[int]): List of uids to exclude from the random sampling.
+        available_uids_mask (torch.BoolTensor): Precomputed get_available_uids_mask of the current metagraph.
     Returns:
         uids (torch.LongTensor): Randomly sampled available uids.
     Notes:
         If `k` is larger than the number of available `uids`, set `k` to the number of available `uids`.
     """
-    candidate_uids = []
-    for uid in range(self.metagraph.n.item()):
-        uid_is_available = check_uid_availability(
-            self.metagraph, uid, self.config.neuron.vpermit_tao_limit
-        )
-        uid_is_not_excluded = exclude is None or uid not in exclude
-
-        if uid_is_available:
-            if uid_is_not_excluded:
-                candidate_uids.append(uid)
+    if available_uids_mask is None:
+        available_uids_mask = get_available_uids_mask(self.metagraph, self.config.neuron.vpermit_tao_limit)
+    candidate_uids = torch.nonzero(available_uids_mask).flatten()
+    if exclude:
+        candidate_uids = candidate_uids[~torch.isin(candidate_uids, torch.tensor(exclude))]
 
     k = max(1, min(len(candidate_uids), k))
-    uids = torch.tensor(random.sample(candidate_uids, k))
+    uids = candidate_uids[torch.randperm(len(candidate_uids))[:k]]
     return uids
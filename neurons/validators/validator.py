@@ -19,6 +19,7 @@
 
 import time
 import argparse
+import asyncio
 import random
 import torch
 import bittensor as bt
@@ -35,9 +36,13 @@ from neurons.storage import store_validator_metadata, get_miners_metadata
 from neurons.validators.scoring import Scorer
 
 from neurons.validators.utils.utils import get_miner_distributions, count_hotkeys_per_ip, count_run_id_per_hotkey
-from neurons.validators.utils.uids import get_random_uids
+from neurons.validators.utils.uids import get_available_uids_mask, get_random_uids
 
 from template.base.validator import BaseValidatorNeuron
+
+# seconds a node block height is reused, chain tips move far slower than validator steps
+BLOCK_HEIGHT_CACHE_TTL = 60
+
 class Validator(BaseValidatorNeuron):
 
     @staticmethod
@@ -78,7 +83,7 @@ class Validator(BaseValidatorNeuron):
         self.validator_config = ValidatorConfig().load_and_get_config_values()
         networks = self.validator_config.get_networks()
         self.nodes = {network : NodeFactory.create_node(network) for network in networks}
-        self.block_height_cache = {network: self.nodes[network].get_current_block_height() for network in networks}
+        self.block_height_cache = {}
         
         super(Validator, self).__init__(config)
 
@@ -86,14 +91,27 @@ class Validator(BaseValidatorNeuron):
 
         
 
-    def cross_validate(self, axon, node, start_block_height, last_block_height, k=20):
+    async def cross_validate(self, axon, node, start_block_height, last_block_height, k=20, run_id=None, shared_block_checks=None):
 
         if (last_block_height+1-start_block_height) <  k:
             bt.logging.debug("Miner block height is Invalid")
             return False, 0
 
-        blocks_to_check = random.sample(range(start_block_height, last_block_height + 1), k=k)
-        response = self.dendrite.query(
+        # miners reporting the same graph database get the same blocks, so the node blocks are fetched once per step
+        # and every miner is still checked against its own data samples
+        shared_block_check = None
+        if run_id is not None and shared_block_checks is not None:
+            key = (node, run_id, start_block_height, last_block_height)
+            if key not in shared_block_checks:
+                shared_block_checks[key] = {
+                    "blocks_to_check": random.sample(range(start_block_height, last_block_height + 1), k=k),
+                    "blocks": None,
+                }
+            shared_block_check = shared_block_checks[key]
+            blocks_to_check = shared_block_check["blocks_to_check"]
+        else:
+            blocks_to_check = random.sample(range(start_block_height, last_block_height + 1), k=k)
+        response = await self.dendrite.forward(
             axon,
             protocol.BlockCheck(blocks_to_check=blocks_to_check),
             deserialize=True,
@@ -103,12 +121,25 @@ class Validator(BaseValidatorNeuron):
             bt.logging.debug(f"Skipping response {response}")
             return None, None
 
-        result = node.validate_all_data_samples(response.output.data_samples, blocks_to_check)
+        # node RPC calls are blocking, keep them off the event loop so other miners are checked meanwhile
+        if shared_block_check is None:
+            result = await asyncio.to_thread(node.validate_all_data_samples, response.output.data_samples, blocks_to_check)
+        else:
+            if shared_block_check["blocks"] is None:
+                shared_block_check["blocks"] = asyncio.ensure_future(asyncio.to_thread(node.get_blocks_by_heights, blocks_to_check))
+            # a failed fetch says nothing about the miners sharing it, each of them is skipped rather than scored 0
+            try:
+                blocks = await shared_block_check["blocks"]
+            except Exception as e:
+                bt.logging.error(f"Cross-Validation: failed to fetch blocks {blocks_to_check}: {e}")
+                return None, None
+            # the blocks are already fetched, only compares the samples so it stays on the event loop
+            result = node.validate_all_data_samples(response.output.data_samples, blocks_to_check, blocks)
         response_time = response.dendrite.process_time
         return result, response_time
 
 
-    def get_reward(self, response: DiscoveryOutput, ip_per_hotkey=None, run_id_per_hotkey=None, miner_distribution=None):
+    async def get_reward(self, response: DiscoveryOutput, ip_per_hotkey=None, run_id_per_hotkey=None, miner_distribution=None, shared_block_checks=None):
         output: DiscoveryOutput = response.output
         network = output.metadata.network
         start_block_height = output.start_block_height
@@ -119,11 +150,16 @@ class Validator(BaseValidatorNeuron):
 
         multiple_ips = ip_per_hotkey[axon_ip] > MAX_MULTIPLE_IPS
         multiple_run_ids = run_id_per_hotkey[hot_key] > MAX_MULTIPLE_RUN_ID
+        # the scorer gives these a zero score anyway, skip the block check query and node RPC calls
+        if multiple_ips or multiple_run_ids:
+            bt.logging.info(f"Cross-Validation: {hot_key=} skipped, {multiple_ips=} {multiple_run_ids=}")
+            return 0
 
-        cross_validation_result, response_time = self.cross_validate(response.axon, self.nodes[network], start_block_height, last_block_height)
+        cross_validation_result, response_time = await self.cross_validate(response.axon, self.nodes[network], start_block_height, last_block_height,
+                                                                           run_id=output.run_id, shared_block_checks=shared_block_checks)
 
         if cross_validation_result is None:
-            bt.logging.debug(f"Cross-Validation: {hot_key=} Timeout skipping response")
+            bt.logging.debug(f"Cross-Validation: {hot_key=} Timeout or node failure, skipping response")
             return None
         if not cross_validation_result:
             bt.logging.info(f"Cross-Validation: {hot_key=} Test failed")
@@ -135,7 +171,7 @@ class Validator(BaseValidatorNeuron):
             response_time,
             start_block_height,
             last_block_height,
-            self.block_height_cache[network],
+            self.get_block_height(network),
             miner_distribution,
             multiple_ips,
             multiple_run_ids
@@ -144,7 +180,7 @@ class Validator(BaseValidatorNeuron):
         return score
 
     async def forward(self):
-        available_uids = get_random_uids(self, self.config.neuron.sample_size)
+        available_uids = get_random_uids(self, self.config.neuron.sample_size, available_uids_mask=self.available_uids_mask)
 
         filtered_axons = [self.metagraph.axons[uid] for uid in available_uids]
         
@@ -152,19 +188,40 @@ class Validator(BaseValidatorNeuron):
         run_id_per_hotkey = count_run_id_per_hotkey(self.miners_metadata)
         miner_distribution = get_miner_distributions(self.miners_metadata, self.validator_config.get_networks())
 
-        responses = self.dendrite.query(
-            filtered_axons,
-            protocol.Discovery(),
-            deserialize=True,
-            timeout = self.validator_config.discovery_timeout,
-        )
-
+        # miners are cross-validated concurrently, so a step takes about as long as the slowest miner
+        semaphore = asyncio.Semaphore(self.config.neuron.max_concurrent_cross_validations)
+        shared_block_checks = {}
+
+        async def get_limited_reward(response):
+            async with semaphore:
+                # a failing miner must not abort the step, the error would end the validator run loop
+                try:
+                    return await self.get_reward(response,
+                                                 ip_per_hotkey=ip_per_hotkey,
+                                                 run_id_per_hotkey=run_id_per_hotkey,
+                                                 miner_distribution=miner_distribution,
+                                                 shared_block_checks=shared_block_checks)
+                except Exception as e:
+                    bt.logging.error(f"Cross-Validation: hot_key={response.axon.hotkey} failed with exception: {e}")
+                    return None
+
+        async def discover(uid, axon):
+            response = await self.dendrite.forward(
+                axon,
+                protocol.Discovery(),
+                deserialize=True,
+                timeout = self.validator_config.discovery_timeout,
+            )
+            return uid, response
+
+        # each miner is cross-validated as soon as its discovery response arrives, not after the slowest one
         valid_uids = []
-        valid_responses = []
-        for uid, response in zip(available_uids, responses):
+        reward_tasks = []
+        for discovery in asyncio.as_completed([discover(uid, axon) for uid, axon in zip(available_uids.tolist(), filtered_axons)]):
+            uid, response = await discovery
             if response and response.output and self.miners_metadata.get(response.axon.hotkey):
                 valid_uids.append(uid)
-                valid_responses.append(response)
+                reward_tasks.append(asyncio.create_task(get_limited_reward(response)))
 
             status_code = response.axon.status_code
             status_message = response.axon.status_message
@@ -175,34 +232,36 @@ class Validator(BaseValidatorNeuron):
             elif response.is_timeout:
                 bt.logging.info(f"Skipping response: Timeout, miner {response.axon.hotkey}")
 
-        if valid_responses:
-            rewards = [
-                self.get_reward(response, 
-                                ip_per_hotkey=ip_per_hotkey,
-                                run_id_per_hotkey=run_id_per_hotkey,
-                                miner_distribution=miner_distribution) for response in valid_responses
-            ]
+        if reward_tasks:
+            rewards = await asyncio.gather(*reward_tasks)
             # Remove None reward as they represent timeout cross validation
-            filtered_data = [(reward, uid) for reward, uid in zip(rewards, valid_uids) if reward is not None]
-
-            if filtered_data:
-                rewards, valid_uids = zip(*filtered_data)
+            mask = torch.tensor([reward is not None for reward in rewards], dtype=torch.bool)
 
-                rewards = torch.FloatTensor(rewards)
+            if mask.any():
+                rewards = torch.FloatTensor([reward or 0 for reward in rewards])[mask]
+                valid_uids = torch.as_tensor(valid_uids)[mask].tolist()
                 self.update_scores(rewards, valid_uids)
             else: 
                 bt.logging.info('Skipping update_scores() as no responses were valid')
 
     def sync_validator(self):
-        self.miners_metadata = get_miners_metadata(self.config, self.metagraph)
+        self.miners_metadata = get_miners_metadata(self.config, self.metagraph, self.subtensor)
         self.validator_config = ValidatorConfig().load_and_get_config_values()
         self.scorer = Scorer(self.validator_config)
 
         self.networks = self.validator_config.get_networks()
-        self.block_height_cache = {network: self.nodes[network].get_current_block_height() for network in self.networks}
+        # axons, permits and stakes only change when the metagraph is synced
+        self.available_uids_mask = get_available_uids_mask(self.metagraph, self.config.neuron.vpermit_tao_limit)
 
         validator_uid = self.metagraph.hotkeys.index(self.wallet.hotkey.ss58_address)
-        store_validator_metadata(self.config, self.wallet, validator_uid)
+        store_validator_metadata(self.config, self.wallet, validator_uid, self.subtensor)
+
+    def get_block_height(self, network):
+        block_height, fetched_at = self.block_height_cache.get(network, (None, 0))
+        if block_height is None or time.time() - fetched_at >= BLOCK_HEIGHT_CACHE_TTL:
+            block_height = self.nodes[network].get_current_block_height()
+            self.block_height_cache[network] = (block_height, time.time())
+        return block_height
 
     def resync_metagraph(self):
         super(Validator, self).resync_metagraph()
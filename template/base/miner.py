@@ -92,7 +92,7 @@ class BaseMinerNeuron(BaseNeuron):
         try:
             while not self.should_exit:
                 while (
-                    self.block - self.metagraph.last_update[self.uid]
+                    self.block - self.last_sync_block
                     < self.config.neuron.epoch_length
                 ):
                     # Wait before checking again.
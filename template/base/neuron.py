@@ -86,6 +86,8 @@ class BaseNeuron(ABC):
         # The metagraph holds the state of the network, letting us know about other validators and miners.
         self.metagraph = self.subtensor.metagraph(self.config.netuid)
         bt.logging.info(f"Metagraph: {self.metagraph}")
+        # None makes the first sync resync, miners commit their metadata there
+        self.last_sync_block = None
         
         # Check if the miner is registered on the Bittensor network before proceeding further.
         self.check_registered()
@@ -114,6 +116,7 @@ class BaseNeuron(ABC):
 
         if self.should_sync_metagraph():
             self.resync_metagraph()
+            self.last_sync_block = self.block
 
         if self.should_set_weights():
             self.set_weights()
@@ -137,8 +140,11 @@ class BaseNeuron(ABC):
         """
         Check if enough epoch blocks have elapsed since the last checkpoint to sync.
         """
+        # last_update only moves when this uid sets weights, so it can not tell when the metagraph was last synced
+        if self.last_sync_block is None:
+            return True
         return (
-            self.block - self.metagraph.last_update[self.uid]
+            self.block - self.last_sync_block
         ) > self.config.neuron.epoch_length
 
     def should_set_weights(self) -> bool:
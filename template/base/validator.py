@@ -316,19 +316,17 @@ class BaseValidatorNeuron(BaseNeuron):
             # Replace any NaN values in rewards with 0.
             rewards = torch.nan_to_num(rewards, 0)
 
-        # Compute forward pass rewards, assumes uids are mutually exclusive.
-        # shape: [ metagraph.n ]
-        scattered_rewards: torch.FloatTensor = self.scores.scatter(
-            0, torch.tensor(uids).to(self.device), rewards
-        ).to(self.device)
-        bt.logging.debug(f"Scattered rewards: {rewards}")
-
-        # Update scores with rewards produced by this step.
-        # shape: [ metagraph.n ]
+        # Only the rewarded uids change, assumes uids are mutually exclusive.
+        # shape: [ len(uids) ]
+        uids = torch.as_tensor(uids, dtype=torch.long, device=self.device)
+        rewards = rewards.to(self.device)
+        bt.logging.debug(f"Rewards for uids {uids.tolist()}: {rewards}")
+
+        # Update scores with rewards produced by this step, in place at the rewarded uids
+        # instead of blending a scattered copy of the whole [ metagraph.n ] tensor.
         alpha: float = self.config.neuron.moving_average_alpha
-        self.scores: torch.FloatTensor = alpha * scattered_rewards + (
-            1 - alpha
-        ) * self.scores.to(self.device)
+        self.scores = self.scores.to(self.device)
+        self.scores[uids] = alpha * rewards + (1 - alpha) * self.scores[uids]
         bt.logging.debug(f"Updated moving avg scores: {self.scores}")
 
     def save_state(self):
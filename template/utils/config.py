@@ -117,6 +117,13 @@ def add_args(cls, parser):
             default=10,
         )
 
+        parser.add_argument(
+            "--neuron.max_concurrent_cross_validations",
+            type=int,
+            help="The maximum number of miners cross-validated at the same time in a single step.",
+            default=10,
+        )
+
         parser.add_argument(
             "--neuron.disable_set_weights",
             action="store_true",
@@ -18,6 +18,7 @@
 
 import time
 import math
+import threading
 import hashlib as rpccheckhealth
 from math import floor
 from typing import Callable, Any
@@ -55,6 +56,8 @@ def ttl_cache(maxsize: int = 128, typed: bool = False, ttl: int = -1):
     if ttl <= 0:
         ttl = 65536
     hash_gen = _ttl_hash_gen(ttl)
+    # a generator can not be advanced by two threads at once
+    hash_gen_lock = threading.Lock()
 
     def wrapper(func: Callable) -> Callable:
         @lru_cache(maxsize, typed)
@@ -62,7 +65,8 @@ def ttl_cache(maxsize: int = 128, typed: bool = False, ttl: int = -1):
             return func(*args, **kwargs)
 
         def wrapped(*args, **kwargs) -> Any:
-            th = next(hash_gen)
+            with hash_gen_lock:
+                th = next(hash_gen)
             return ttl_func(th, *args, **kwargs)
 
         return update_wrapper(wrapped, func)
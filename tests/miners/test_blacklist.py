@@ -21,7 +21,7 @@ class TestBlackList(unittest.TestCase):
     def test_base_blacklist_unrecognized_hotkey(self):
         synapse = protocol.BlockCheck()        
         synapse.dendrite.hotkey = 'unrecognized_hotkey'
-        self.mock_metagraph.hotkeys = {'some_other_hotkey'}
+        self.validator.hotkey_to_uid = {'some_other_hotkey': 0}
 
         result, message = base_blacklist(self.validator, synapse)
         self.assertTrue(result)
@@ -31,7 +31,7 @@ class TestBlackList(unittest.TestCase):
         synapse = protocol.BlockCheck()        
         synapse.dendrite.hotkey = 'valid_hotkey'
         synapse.version = protocol.VERSION+1
-        self.mock_metagraph.hotkeys = {'valid_hotkey'}
+        self.validator.hotkey_to_uid = {'valid_hotkey': 0}
         self.mock_config.mode = 'prod'
         self.mock_miner_config.whitelisted_hotkeys = {'valid_hotkey'}
         self.mock_miner_config.blacklisted_hotkeys = set()
@@ -43,7 +43,7 @@ class TestBlackList(unittest.TestCase):
     def test_base_blacklist_blacklisted_hotkey(self):
         synapse = protocol.BlockCheck()        
         synapse.dendrite.hotkey = 'blacklisted_hotkey'
-        self.mock_metagraph.hotkeys = {'blacklisted_hotkey'}
+        self.validator.hotkey_to_uid = {'blacklisted_hotkey': 0}
         self.mock_miner_config.blacklisted_hotkeys = {'blacklisted_hotkey'}
 
         result, message = base_blacklist(self.validator, synapse)
@@ -53,7 +53,7 @@ class TestBlackList(unittest.TestCase):
     def test_base_blacklist_not_whitelisted_hotkey(self):
         synapse = protocol.BlockCheck()        
         synapse.dendrite.hotkey = 'not_whitelisted_hotkey'
-        self.mock_metagraph.hotkeys = {'not_whitelisted_hotkey'}
+        self.validator.hotkey_to_uid = {'not_whitelisted_hotkey': 0}
         self.mock_miner_config.whitelisted_hotkeys = set()
         self.mock_config.mode = 'prod'
 
@@ -64,7 +64,7 @@ class TestBlackList(unittest.TestCase):
     def test_base_blacklist_recognized_hotkey(self):
         synapse = protocol.BlockCheck()        
         synapse.dendrite.hotkey = 'recognized_hotkey'
-        self.mock_metagraph.hotkeys = {'recognized_hotkey'}
+        self.validator.hotkey_to_uid = {'recognized_hotkey': 0}
         self.mock_miner_config.whitelisted_hotkeys = {'recognized_hotkey'}
 
         result, message = base_blacklist(self.validator, synapse)
@@ -84,7 +84,7 @@ class TestBlackList(unittest.TestCase):
 
         synapse = protocol.Discovery()        
         synapse.dendrite.hotkey = 'unregistered_hotkey'
-        self.mock_metagraph.axons = []
+        self.validator.hotkey_to_uid = {}
         with patch('neurons.miners.blacklist.base_blacklist', return_value=(False, '')):
             result, message = discovery_blacklist(self.validator, synapse)
         self.assertTrue(result)
@@ -93,7 +93,7 @@ class TestBlackList(unittest.TestCase):
     def test_discovery_blacklist_low_tao_stake(self):
         synapse = protocol.Discovery()        
         synapse.dendrite.hotkey = 'low_stake_hotkey'
-        self.mock_metagraph.axons = [MagicMock(hotkey='low_stake_hotkey')]
+        self.validator.hotkey_to_uid = {'low_stake_hotkey': 0}
         self.mock_metagraph.neurons = [MagicMock(stake=MagicMock(tao=5))]
         self.mock_miner_config.stake_threshold = 10
         self.mock_config.mode = 'prod'
@@ -106,7 +106,7 @@ class TestBlackList(unittest.TestCase):
     def test_discovery_blacklist_request_rate_limiting(self):
         synapse = protocol.Discovery()        
         synapse.dendrite.hotkey = 'rate_limit_hotkey'
-        self.mock_metagraph.axons = [MagicMock(hotkey='rate_limit_hotkey')]
+        self.validator.hotkey_to_uid = {'rate_limit_hotkey': 0}
         self.mock_metagraph.neurons = [MagicMock(stake=MagicMock(tao=15))]
         self.mock_miner_config.stake_threshold = 10
         self.mock_config.mode = 'prod'
@@ -122,7 +122,7 @@ class TestBlackList(unittest.TestCase):
     def test_discovery_blacklist_hotkey_recognized(self):
         synapse = protocol.Discovery()        
         synapse.dendrite.hotkey = 'recognized_hotkey'
-        self.mock_metagraph.axons = [MagicMock(hotkey='recognized_hotkey')]
+        self.validator.hotkey_to_uid = {'recognized_hotkey': 0}
         self.mock_metagraph.neurons = [MagicMock(stake=MagicMock(tao=15))]
         self.mock_miner_config.stake_threshold = 10
         self.mock_config.mode = 'prod'
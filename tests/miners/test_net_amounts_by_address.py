@@ -0,0 +1,68 @@
+import random
+import unittest
+from unittest.mock import patch
+
+from neurons.miners.bitcoin.funds_flow_v2 import graph_indexer
+from neurons.miners.bitcoin.funds_flow_v2.graph_indexer import net_amounts_by_address
+
+
+def per_address_net_amounts(in_amount_by_address, out_amount_by_address):
+    # the netting create_graph_focused_on_money_flow did per address before net_amounts_by_address
+    in_amount_by_address = dict(in_amount_by_address)
+    out_amount_by_address = dict(out_amount_by_address)
+    for address in in_amount_by_address.keys():
+        if in_amount_by_address[address] == 0:
+            continue
+        if address in out_amount_by_address and out_amount_by_address[address] != 0:
+            if in_amount_by_address[address] > out_amount_by_address[address]:
+                in_amount_by_address[address] -= out_amount_by_address[address]
+                out_amount_by_address[address] = 0
+            elif in_amount_by_address[address] < out_amount_by_address[address]:
+                out_amount_by_address[address] -= in_amount_by_address[address]
+                in_amount_by_address[address] = 0
+            else:
+                in_amount_by_address[address] = 0
+                out_amount_by_address[address] = 0
+
+    return (
+        {address: amount for address, amount in in_amount_by_address.items() if amount != 0},
+        {address: amount for address, amount in out_amount_by_address.items() if amount != 0},
+    )
+
+
+def random_amounts_by_address(num_addresses, seed):
+    rng = random.Random(seed)
+    addresses = [f"address{i}" for i in range(num_addresses)]
+    in_amount_by_address = {address: rng.choice([0, 1, 5000, 2 ** 40]) for address in rng.sample(addresses, num_addresses // 2)}
+    out_amount_by_address = {address: rng.choice([0, 1, 5000, 2 ** 40]) for address in rng.sample(addresses, num_addresses // 2)}
+    return in_amount_by_address, out_amount_by_address
+
+
+class TestNetAmountsByAddress(unittest.TestCase):
+
+    def test_small_transaction(self):
+        in_amount_by_address = {"a": 100, "b": 50, "c": 30}
+        out_amount_by_address = {"a": 40, "b": 50, "c": 80, "d": 10}
+
+        result = net_amounts_by_address(in_amount_by_address, out_amount_by_address)
+        self.assertEqual(result, ({"a": 60}, {"c": 50, "d": 10}))
+
+    def test_matches_per_address_netting(self):
+        for num_addresses in [0, 2, 40, 256, 2000]:
+            for threshold in [0, 10 ** 6]:
+                with self.subTest(num_addresses=num_addresses, threshold=threshold):
+                    in_amount_by_address, out_amount_by_address = random_amounts_by_address(num_addresses, seed=num_addresses)
+                    # threshold 0 always takes the numpy path, a huge threshold always takes the loop
+                    with patch.object(graph_indexer, "NUMPY_NETTING_THRESHOLD", threshold):
+                        result = net_amounts_by_address(in_amount_by_address, out_amount_by_address)
+                    self.assertEqual(result, per_address_net_amounts(in_amount_by_address, out_amount_by_address))
+
+    def test_numpy_path_returns_python_ints(self):
+        in_amount_by_address, out_amount_by_address = random_amounts_by_address(2000, seed=1)
+        net_in_amount_by_address, net_out_amount_by_address = net_amounts_by_address(in_amount_by_address, out_amount_by_address)
+        for amount in list(net_in_amount_by_address.values()) + list(net_out_amount_by_address.values()):
+            self.assertIs(type(amount), int)
+
+
+if __name__ == '__main__':
+    unittest.main()
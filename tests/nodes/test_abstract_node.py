@@ -0,0 +1,69 @@
+import unittest
+
+from neurons.nodes.abstract_node import Node
+
+
+class FakeNode(Node):
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.fetched_heights = []
+
+    def get_current_block_height(self):
+        return max(self.blocks)
+
+    def get_block_by_height(self, block_height):
+        self.fetched_heights.append(block_height)
+        return self.blocks.get(block_height)
+
+    def get_transaction_by_hash(self, tx_hash):
+        raise NotImplementedError()
+
+
+class TestAbstractNode(unittest.TestCase):
+
+    def setUp(self):
+        self.node = FakeNode({1: {'tx': ['a']}, 2: {'tx': ['b', 'c']}, 3: {'tx': []}})
+        self.blocks_to_check = [1, 2, 3]
+
+    def test_get_blocks_by_heights(self):
+        result = self.node.get_blocks_by_heights([1, 2, 4])
+        self.assertEqual(result, {1: {'tx': ['a']}, 2: {'tx': ['b', 'c']}, 4: None})
+
+    def test_validate_all_data_samples_valid(self):
+        data_samples = [{'block_height': 3, 'transaction_count': 0}, {'block_height': 1, 'transaction_count': 1}, {'block_height': 2, 'transaction_count': 2}]
+        self.assertIs(self.node.validate_all_data_samples(data_samples, self.blocks_to_check), True)
+
+    def test_validate_all_data_samples_wrong_transaction_count(self):
+        data_samples = [{'block_height': 1, 'transaction_count': 1}, {'block_height': 2, 'transaction_count': 5}, {'block_height': 3, 'transaction_count': 0}]
+        self.assertIs(self.node.validate_all_data_samples(data_samples, self.blocks_to_check), False)
+
+    def test_validate_all_data_samples_missing_or_repeated_height(self):
+        cases = [
+            [{'block_height': 1, 'transaction_count': 1}, {'block_height': 2, 'transaction_count': 2}],
+            [{'block_height': 1, 'transaction_count': 1}, {'block_height': 1, 'transaction_count': 1}, {'block_height': 2, 'transaction_count': 2}],
+        ]
+        for data_samples in cases:
+            with self.subTest(data_samples=data_samples):
+                self.assertIs(self.node.validate_all_data_samples(data_samples, self.blocks_to_check), False)
+        self.assertEqual(self.node.fetched_heights, [])
+
+    def test_validate_all_data_samples_node_failure(self):
+        node = FakeNode({1: {'tx': ['a']}, 2: {'tx': ['b', 'c']}})
+        data_samples = [{'block_height': 1, 'transaction_count': 1}, {'block_height': 2, 'transaction_count': 2}, {'block_height': 3, 'transaction_count': 0}]
+        self.assertIsNone(node.validate_all_data_samples(data_samples, self.blocks_to_check))
+
+        # a wrong count is known to be wrong even if another block is unavailable
+        data_samples[0]['transaction_count'] = 7
+        self.assertIs(node.validate_all_data_samples(data_samples, self.blocks_to_check), False)
+
+    def test_validate_all_data_samples_prefetched_blocks(self):
+        data_samples = [{'block_height': 1, 'transaction_count': 1}, {'block_height': 2, 'transaction_count': 2}, {'block_height': 3, 'transaction_count': 0}]
+        blocks = self.node.get_blocks_by_heights(self.blocks_to_check)
+        self.node.fetched_heights = []
+
+        self.assertIs(self.node.validate_all_data_samples(data_samples, self.blocks_to_check, blocks), True)
+        self.assertEqual(self.node.fetched_heights, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from bitcoinrpc.authproxy import JSONRPCException
+
+from neurons.nodes.bitcoin.node import BitcoinNode
+
+
+class TestBitcoinNode(unittest.TestCase):
+
+    def test_batch_or_each_batched(self):
+        rpc_connection = MagicMock()
+        rpc_connection.batch_.return_value = ['hash1', 'hash2']
+
+        result = BitcoinNode.batch_or_each(rpc_connection, [["getblockhash", 1], ["getblockhash", 2]])
+        self.assertEqual(result, ['hash1', 'hash2'])
+        rpc_connection.getblockhash.assert_not_called()
+
+    def test_batch_or_each_failing_call(self):
+        rpc_connection = MagicMock()
+        rpc_connection.batch_.side_effect = JSONRPCException({'code': -8, 'message': 'Block height out of range'})
+        rpc_connection.getblockhash.side_effect = ['hash1', JSONRPCException({'code': -8, 'message': 'Block height out of range'})]
+
+        result = BitcoinNode.batch_or_each(rpc_connection, [["getblockhash", 1], ["getblockhash", 2]])
+        self.assertEqual(result, ['hash1', None])
+
+    @patch('neurons.nodes.bitcoin.node.AuthServiceProxy')
+    def test_get_blocks_by_heights_failing_height(self, mock_auth_service_proxy):
+        rpc_connection = mock_auth_service_proxy.return_value
+        rpc_connection.batch_.side_effect = [
+            JSONRPCException({'code': -8, 'message': 'Block height out of range'}),
+            [{'tx': ['a']}],
+        ]
+        rpc_connection.getblockhash.side_effect = ['hash1', JSONRPCException({'code': -8, 'message': 'Block height out of range'})]
+
+        result = BitcoinNode().get_blocks_by_heights([1, 2])
+        self.assertEqual(result, {1: {'tx': ['a']}, 2: None})
+
+    @patch('neurons.nodes.bitcoin.node.AuthServiceProxy')
+    def test_get_blocks_by_heights_connection_error(self, mock_auth_service_proxy):
+        mock_auth_service_proxy.return_value.batch_.side_effect = ConnectionRefusedError()
+
+        with self.assertRaises(ConnectionRefusedError):
+            BitcoinNode().get_blocks_by_heights([1, 2])
+
+    @staticmethod
+    def txn_data(txn_id):
+        return {'vout': [{'n': 0, 'value': 0.5, 'scriptPubKey': {'address': f"address-{txn_id}"}}]}
+
+    @patch('neurons.nodes.bitcoin.node.AuthServiceProxy')
+    def test_get_addresses_and_amounts_from_hash_table(self, mock_auth_service_proxy):
+        node = BitcoinNode()
+        txn_id = "abc" + "0" * 61
+        node.tx_out_hash_table[txn_id[:3]][(txn_id, "1")] = ("address", "5000")
+
+        result = node.get_addresses_and_amounts_by_txn_ids_and_vout_ids([(txn_id, "1")])
+        self.assertEqual(result, {(txn_id, "1"): ("address", 5000)})
+        mock_auth_service_proxy.assert_not_called()
+
+    @patch('neurons.nodes.bitcoin.node.AuthServiceProxy')
+    def test_get_addresses_and_amounts_batched_misses(self, mock_auth_service_proxy):
+        node = BitcoinNode()
+        hit_txn_id = "fff" + "0" * 61
+        node.tx_out_hash_table[hit_txn_id[:3]][(hit_txn_id, "0")] = ("address", "1")
+        # 501 distinct missing transactions, one spent twice, span two batches of 500
+        missing_txn_ids = [f"{i:064x}" for i in range(501)]
+        txn_vout_ids = [(hit_txn_id, "0")] + [(txn_id, "0") for txn_id in missing_txn_ids] + [(missing_txn_ids[0], "0")]
+
+        rpc_connection = mock_auth_service_proxy.return_value
+        rpc_connection.batch_.side_effect = lambda rpc_calls: [self.txn_data(rpc_call[1]) for rpc_call in rpc_calls]
+
+        result = node.get_addresses_and_amounts_by_txn_ids_and_vout_ids(txn_vout_ids)
+
+        self.assertEqual([len(call.args[0]) for call in rpc_connection.batch_.call_args_list], [500, 1])
+        self.assertEqual(result[(hit_txn_id, "0")], ("address", 1))
+        for txn_id in missing_txn_ids:
+            self.assertEqual(result[(txn_id, "0")], (f"address-{txn_id}", 50000000))
+        self.assertEqual(len(result), 502)
+
+    @patch('neurons.nodes.bitcoin.node.AuthServiceProxy')
+    def test_get_addresses_and_amounts_failing_batch(self, mock_auth_service_proxy):
+        node = BitcoinNode()
+        txn_ids = [f"{i:064x}" for i in range(2)]
+        rpc_connection = mock_auth_service_proxy.return_value
+        rpc_connection.batch_.side_effect = JSONRPCException({'code': -5, 'message': 'No such mempool or blockchain transaction'})
+
+        # the batch is repeated call by call, a transaction the node has is still resolved
+        rpc_connection.getrawtransaction.side_effect = lambda txn_id, verbose: self.txn_data(txn_id)
+        result = node.get_addresses_and_amounts_by_txn_ids_and_vout_ids([(txn_id, "0") for txn_id in txn_ids])
+        self.assertEqual(result, {(txn_id, "0"): (f"address-{txn_id}", 50000000) for txn_id in txn_ids})
+
+        # a transaction the node does not have fails the lookup
+        rpc_connection.getrawtransaction.side_effect = [self.txn_data(txn_ids[0]), JSONRPCException({'code': -5, 'message': 'No such mempool or blockchain transaction'})]
+        with self.assertRaises(ValueError):
+            node.get_addresses_and_amounts_by_txn_ids_and_vout_ids([(txn_id, "0") for txn_id in txn_ids])
+
+
+if __name__ == '__main__':
+    unittest.main()
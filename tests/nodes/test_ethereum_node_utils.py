@@ -0,0 +1,61 @@
+import unittest
+
+from hexbytes import HexBytes
+
+from neurons.nodes.evm.ethereum.node_utils import format_rpc_block
+
+
+class TestFormatRpcBlock(unittest.TestCase):
+
+    def setUp(self):
+        self.raw_block = {
+            "number": "0x112a880",
+            "timestamp": "0x6553f100",
+            "difficulty": "0x0",
+            "totalDifficulty": "0xc70d815d562d3cfa955",
+            "gasUsed": "0x1c9c380",
+            "gasLimit": "0x1c9c380",
+            "hash": "0x" + "ab" * 32,
+            "parentHash": "0x" + "cd" * 32,
+            "nonce": "0x0000000000000000",
+            "miner": "0x95222290dd7278aa3ddd389cc1e1d165cc4bafe5",
+            "transactions": ["0x" + "01" * 32, "0x" + "02" * 32],
+        }
+
+    def test_format_rpc_block(self):
+        block = format_rpc_block(self.raw_block)
+
+        self.assertEqual(block["number"], 18000000)
+        self.assertEqual(block["timestamp"], 0x6553f100)
+        self.assertEqual(block["difficulty"], 0)
+        self.assertEqual(block["totalDifficulty"], 0xc70d815d562d3cfa955)
+        self.assertEqual(block["gasUsed"], 30000000)
+        self.assertEqual(block["gasLimit"], 30000000)
+        self.assertEqual(block["hash"], HexBytes("0x" + "ab" * 32))
+        self.assertEqual(block["parentHash"], HexBytes("0x" + "cd" * 32))
+        self.assertEqual(block["nonce"], HexBytes("0x0000000000000000"))
+        self.assertEqual(block["miner"], "0x95222290dd7278aa3ddd389cc1e1d165cc4bafe5")
+        self.assertEqual(block["transactions"], [HexBytes("0x" + "01" * 32), HexBytes("0x" + "02" * 32)])
+
+    def test_format_rpc_block_missing_fields(self):
+        # post merge nodes may omit totalDifficulty, and pending blocks carry null hash and nonce
+        del self.raw_block["totalDifficulty"]
+        self.raw_block["hash"] = None
+        self.raw_block["nonce"] = None
+        self.raw_block["transactions"] = []
+
+        block = format_rpc_block(self.raw_block)
+
+        self.assertNotIn("totalDifficulty", block)
+        self.assertIsNone(block["hash"])
+        self.assertIsNone(block["nonce"])
+        self.assertEqual(block["transactions"], [])
+
+    def test_format_rpc_block_keeps_raw_block(self):
+        raw_block = dict(self.raw_block)
+        format_rpc_block(self.raw_block)
+        self.assertEqual(self.raw_block, raw_block)
+
+
+if __name__ == '__main__':
+    unittest.main()
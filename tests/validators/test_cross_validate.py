@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from neurons.nodes.abstract_node import Node
+from neurons.validators.validator import Validator
+
+
+class FakeNode(Node):
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.fetches = []
+
+    def get_current_block_height(self):
+        return 1000
+
+    def get_block_by_height(self, block_height):
+        return {'tx': ['tx'] * (block_height % 7)}
+
+    def get_blocks_by_heights(self, block_heights):
+        self.fetches.append(list(block_heights))
+        if self.fail:
+            raise ConnectionRefusedError()
+        return super().get_blocks_by_heights(block_heights)
+
+    def get_transaction_by_hash(self, tx_hash):
+        raise NotImplementedError()
+
+
+class TestCrossValidate(unittest.TestCase):
+
+    def setUp(self):
+        # only what cross_validate uses, the validator is not connected to a network
+        self.validator = Validator.__new__(Validator)
+        self.validator.validator_config = MagicMock(discovery_timeout=10)
+        self.validator.dendrite = MagicMock()
+        self.validator.dendrite.forward = self.forward
+        self.blocks_to_check_by_axon = {}
+
+    async def forward(self, axon, synapse, deserialize=True, timeout=None):
+        # the honest miner counts the transactions right, the other one is off by one
+        self.blocks_to_check_by_axon[axon] = synapse.blocks_to_check
+        offset = 0 if axon == "honest" else 1
+        response = MagicMock()
+        response.output.data_samples = [
+            {'block_height': block_height, 'transaction_count': block_height % 7 + offset}
+            for block_height in synapse.blocks_to_check
+        ]
+        response.dendrite.process_time = 1.5
+        return response
+
+    def cross_validate_miners(self, node, axons, run_ids):
+        shared_block_checks = {}
+
+        async def cross_validate_all():
+            return await asyncio.gather(*[
+                self.validator.cross_validate(axon, node, 100, 900, run_id=run_id, shared_block_checks=shared_block_checks)
+                for axon, run_id in zip(axons, run_ids)
+            ])
+
+        return asyncio.run(cross_validate_all())
+
+    def test_miners_sharing_a_run_id(self):
+        node = FakeNode()
+        results = self.cross_validate_miners(node, ["honest", "cheater"], ["run", "run"])
+
+        # both miners are asked for the same blocks, fetched once, and each is judged on its own samples
+        self.assertEqual(self.blocks_to_check_by_axon["honest"], self.blocks_to_check_by_axon["cheater"])
+        self.assertEqual(len(node.fetches), 1)
+        self.assertEqual(results, [(True, 1.5), (False, 1.5)])
+
+    def test_miners_with_different_run_ids(self):
+        node = FakeNode()
+        results = self.cross_validate_miners(node, ["honest", "cheater"], ["run1", "run2"])
+
+        self.assertEqual(len(node.fetches), 2)
+        self.assertEqual(results, [(True, 1.5), (False, 1.5)])
+
+    def test_shared_fetch_failure(self):
+        # a node failure skips every miner sharing the fetch instead of failing them
+        node = FakeNode(fail=True)
+        results = self.cross_validate_miners(node, ["honest", "cheater"], ["run", "run"])
+
+        self.assertEqual(len(node.fetches), 1)
+        self.assertEqual(results, [(None, None), (None, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
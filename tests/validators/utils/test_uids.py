@@ -1,7 +1,7 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 import torch
-from neurons.validators.utils.uids import check_uid_availability, get_random_uids
+from neurons.validators.utils.uids import check_uid_availability, get_available_uids_mask, get_random_uids
 
 class TestYourClass(unittest.TestCase):
 
@@ -26,5 +26,22 @@ class TestYourClass(unittest.TestCase):
         result = check_uid_availability(metagraph, uid, vpermit_tao_limit)
         self.assertTrue(result)
 
+    def test_get_available_uids_mask(self):
+        metagraph = MagicMock()
+        # not serving, serving without permit, permit below limit, permit above limit
+        metagraph.axons = [MagicMock(is_serving=False), MagicMock(is_serving=True), MagicMock(is_serving=True), MagicMock(is_serving=True)]
+        metagraph.validator_permit = torch.tensor([False, False, True, True])
+        metagraph.S = torch.tensor([0.0, 100.0, 5.0, 100.0])
+
+        result = get_available_uids_mask(metagraph, 10)
+        self.assertEqual(result.tolist(), [False, True, True, False])
+
+    def test_get_random_uids_with_available_uids_mask(self):
+        validator = MagicMock()
+        available_uids_mask = torch.tensor([False, True, True, False, True])
+
+        result = get_random_uids(validator, 10, exclude=[2], available_uids_mask=available_uids_mask)
+        self.assertEqual(sorted(result.tolist()), [1, 4])
+
 if __name__ == '__main__':
     unittest.main()